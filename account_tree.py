@@ -0,0 +1,144 @@
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from iif_data_types import *
+
+SEPARATOR = ':'
+
+
+@dataclass(eq=False)
+class AccountNode:
+    """One account in the chart of accounts, with totals over its subtree.
+
+    `opening_balance` and `budget` are the account's own amounts; the `total_`
+    fields include every descendant.  `descendants` lists all accounts below
+    this one in the order they were added.
+    """
+    name: str
+    parent: Optional['AccountNode'] = None
+    account: Optional[Account] = None  # None for a parent only known from a child's name
+    depth: int = 0
+    children: dict[str, 'AccountNode'] = field(default_factory=dict)
+    descendants: list['AccountNode'] = field(default_factory=list)
+    opening_balance: float = 0.0
+    budget: float = 0.0
+    total_opening_balance: float = 0.0
+    total_budget: float = 0.0
+
+    @property
+    def short_name(self) -> str:
+        return self.name.rpartition(SEPARATOR)[2]
+
+    def ancestors(self) -> Iterator['AccountNode']:
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+
+class AccountTree:
+    """The chart of accounts as a tree keyed by full `Parent:Child` account name.
+
+    Totals are kept up to date as accounts and budgets are added, each addition
+    touching only the new node's ancestors, so lookups of a node, its rollups
+    and its descendant list are O(1).
+    """
+
+    def __init__(self):
+        self.nodes: dict[str, AccountNode] = {}
+        self.roots: dict[str, AccountNode] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.nodes
+
+    def __getitem__(self, name: str) -> AccountNode:
+        return self.nodes[name]
+
+    def _node(self, name: str) -> AccountNode:
+        node = self.nodes.get(name)
+        if node is not None:
+            return node
+
+        parent_name, sep, _ = name.rpartition(SEPARATOR)
+        parent = self._node(parent_name) if sep else None
+        node = AccountNode(name, parent, depth=parent.depth + 1 if parent else 0)
+        self.nodes[name] = node
+        if parent is None:
+            self.roots[name] = node
+        else:
+            parent.children[node.short_name] = node
+            for ancestor in node.ancestors():
+                ancestor.descendants.append(node)
+        return node
+
+    def _adjust(self, node: AccountNode, opening_balance: float = 0.0, budget: float = 0.0):
+        node.opening_balance += opening_balance
+        node.budget += budget
+        node.total_opening_balance += opening_balance
+        node.total_budget += budget
+        for ancestor in node.ancestors():
+            ancestor.total_opening_balance += opening_balance
+            ancestor.total_budget += budget
+
+    def add_account(self, account: Account) -> AccountNode:
+        """Adds an account, or replaces the account of the same name, and updates the rollups."""
+        node = self._node(account.NAME)
+        self._adjust(node, opening_balance=(account.OBAMOUNT or 0.0) - node.opening_balance)
+        node.account = account
+        return node
+
+    def add_budget(self, budget: Budget) -> AccountNode:
+        """Adds the amounts of a budget line to its account's rollups."""
+        node = self._node(budget.ACCNT)
+        self._adjust(node, budget=sum(amount for amount in budget.AMOUNTS if amount))
+        return node
+
+    def descendants(self, name: str) -> list[AccountNode]:
+        return self.nodes[name].descendants
+
+    def rollup_balance(self, name: str) -> float:
+        return self.nodes[name].total_opening_balance
+
+    def rollup_budget(self, name: str) -> float:
+        return self.nodes[name].total_budget
+
+    def walk(self) -> Iterator[AccountNode]:
+        """Yields every node depth first, parents before their children."""
+        stack = list(reversed(self.roots.values()))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children.values()))
+
+
+def build_account_tree(accounts: Iterable[Account], budgets: Iterable[Budget] = ()) -> AccountTree:
+    tree = AccountTree()
+    for account in accounts:
+        tree.add_account(account)
+    for budget in budgets:
+        tree.add_budget(budget)
+    return tree
+
+
+if __name__ == "__main__":
+    import argparse
+    from convert import parse_iif_file
+
+    parser = argparse.ArgumentParser(description='Print the chart of accounts with rolled up balances and budgets')
+    parser.add_argument('input_file', help='Input IIF file path')
+    parser.add_argument('--account', help='Only print this account and its descendants', metavar='NAME')
+
+    args = parser.parse_args()
+    data = parse_iif_file(args.input_file, sections=[RowType.ACCNT, RowType.BUD])
+    tree = build_account_tree(data[RowType.ACCNT], data[RowType.BUD])
+
+    if args.account:
+        top = tree[args.account]
+        nodes = [top, *sorted(top.descendants, key=lambda node: node.name)]
+    else:
+        nodes = tree.walk()
+    for node in nodes:
+        print(f"{'  ' * node.depth}{node.short_name}\t{node.total_opening_balance:.2f}\t{node.total_budget:.2f}")
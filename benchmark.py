@@ -0,0 +1,348 @@
+import datetime
+import gc
+import json
+import os
+import pickle
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from iif_data_types import *
+from convert import (parse_iif_file, export_to_iif, export_to_qif, export_customers_to_csv,
+                     export_vendors_to_csv, export_othernames_to_csv, csv_to_qif)
+from jsonl_export import export_to_jsonl
+from reverse_convert import csv_to_iif, qif_to_iif
+from iif_query import Query
+import iif_wire
+
+DEFAULT_MIX = {
+    RowType.ACCNT: 5,
+    RowType.CUST: 40,
+    RowType.VEND: 20,
+    RowType.INVITEM: 15,
+    RowType.EMP: 10,
+    RowType.BUD: 10,
+}
+
+_WORDS = ['Acme', 'Global', 'Blue', 'River', 'Summit', 'North', 'Pine', 'Harbor', 'Lake', 'Stone',
+          'Valley', 'Metro', 'Prime', 'Eagle', 'Oak', 'Cedar', 'Bright', 'Union', 'Pacific', 'Atlas']
+_SUFFIXES = ['Inc', 'LLC', 'Co', 'Corp', 'Supply', 'Services', 'Partners', 'Group']
+_STREETS = ['Main St', 'Oak Ave', 'Elm St', 'Market St', 'Park Blvd', '2nd Ave', 'Broadway']
+_CITIES = ['Springfield, IL 62701', 'Portland, OR 97201', 'Austin, TX 73301', 'Denver, CO 80201']
+_ACCOUNT_TYPES = ['BANK', 'AR', 'OCASSET', 'FIXASSET', 'AP', 'OCLIAB', 'LTLIAB', 'EQUITY', 'INC', 'EXP', 'EXEXP']
+_ACCOUNT_ROOTS = ['Checking', 'Savings', 'Office Expenses', 'Payroll', 'Sales', 'Utilities', 'Travel', 'Equipment']
+
+
+def iif_columns(row_type: RowType) -> list[str]:
+    """The IIF column names QuickBooks writes for a section, in dataclass field order."""
+    return list(get_class_by_row_type(row_type).IIF_COLUMNS)
+
+
+class _RecordFactory:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.refnum = 0
+        self.accounts: list[str] = []
+
+    def company(self) -> str:
+        rng = self.rng
+        return f"{rng.choice(_WORDS)} {rng.choice(_WORDS)} {rng.choice(_SUFFIXES)} {self.refnum}"
+
+    def amount(self) -> str:
+        value = self.rng.uniform(-5000, 50000)
+        formatted = f"{value:,.2f}"
+        return f'"{formatted}"' if abs(value) >= 1000 else formatted
+
+    def phone(self) -> str:
+        return f"{self.rng.randint(200, 999)}-555-{self.rng.randint(0, 9999):04d}"
+
+    def values(self, row_type: RowType) -> dict[str, str]:
+        rng = self.rng
+        self.refnum += 1
+        common = {'REFNUM': str(self.refnum), 'TIMESTAMP': str(1600000000 + self.refnum)}
+        if row_type == RowType.ACCNT:
+            root = rng.choice(_ACCOUNT_ROOTS)
+            name = root if not self.accounts or rng.random() < 0.3 else f"{rng.choice(self.accounts)}:Sub {self.refnum}"
+            self.accounts.append(name)
+            return {**common, 'NAME': name, 'ACCNTTYPE': rng.choice(_ACCOUNT_TYPES), 'OBAMOUNT': self.amount(),
+                    'DESC': f"{root} account", 'ACCNUM': str(1000 + self.refnum), 'SCD': '0'}
+        if row_type in (RowType.CUST, RowType.VEND, RowType.OTHERNAME):
+            name = self.company()
+            prefix = 'ADDR' if row_type == RowType.VEND else 'BADDR'
+            record = {**common, 'NAME': name, 'COMPANYNAME': name, f'{prefix}1': name,
+                      f'{prefix}2': f"{rng.randint(1, 9999)} {rng.choice(_STREETS)}", f'{prefix}3': rng.choice(_CITIES),
+                      'PHONE1': self.phone(), 'FAXNUM': self.phone() if rng.random() < 0.3 else '',
+                      'EMAIL': f"info{self.refnum}@example.com" if rng.random() < 0.7 else '',
+                      'TERMS': rng.choice(['Net 30', 'Net 15', 'Due on receipt', '']),
+                      'NOTEPAD': 'Preferred' if rng.random() < 0.1 else ''}
+            if row_type == RowType.CUST:
+                record.update({'SADDR1': record['BADDR1'], 'SADDR2': record['BADDR2'], 'SADDR3': record['BADDR3'],
+                               'CTYPE': rng.choice(['Retail', 'Wholesale', 'Online', '']),
+                               'TAXABLE': rng.choice(['Y', 'N']), 'SALESTAXCODE': rng.choice(['Tax', 'Non'])})
+            return record
+        if row_type == RowType.INVITEM:
+            return {**common, 'NAME': f"Item {self.refnum}", 'INVITEMTYPE': rng.choice(['INVENTORY', 'SERV', 'PART']),
+                    'DESC': f"Widget model {self.refnum}", 'ACCNT': 'Sales', 'PRICE': f"{rng.uniform(1, 500):.2f}",
+                    'COST': f"{rng.uniform(1, 300):.2f}", 'TAXABLE': rng.choice(['Y', 'N']),
+                    'PREFVEND': rng.choice(_WORDS)}
+        if row_type == RowType.EMP:
+            first, last = rng.choice(_WORDS), rng.choice(_WORDS)
+            return {**common, 'NAME': f"{first} {last} {self.refnum}", 'FIRSTNAME': first, 'LASTNAME': last,
+                    'ADDR1': f"{rng.randint(1, 9999)} {rng.choice(_STREETS)}", 'ADDR2': rng.choice(_CITIES),
+                    'PHONE1': self.phone(), 'EMAIL': f"emp{self.refnum}@example.com", 'HIDDEN': 'N'}
+        if row_type == RowType.BUD:
+            record = {'ACCNT': rng.choice(self.accounts or _ACCOUNT_ROOTS), 'PERIOD': 'MONTH', 'STARTDATE': '01/01/2024'}
+            record.update({f'AMOUNT{i}': f"{rng.uniform(0, 900):.2f}" for i in range(1, 13)})
+            return record
+        return {**common, 'NAME': f"{row_type.value} {self.refnum}"}
+
+
+def generate_iif(path: str, rows: int, mix: Optional[dict[RowType, int]] = None, seed: int = 0) -> dict[RowType, int]:
+    """Writes a synthetic IIF list export with `rows` records split across sections by weight."""
+    mix = mix or DEFAULT_MIX
+    total_weight = sum(mix.values())
+    counts = {row_type: rows * weight // total_weight for row_type, weight in mix.items()}
+    counts[max(mix, key=mix.get)] += rows - sum(counts.values())
+
+    factory = _RecordFactory(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("!HDR\tPROD\tVER\tREL\tIIFVER\tDATE\tTIME\n")
+        f.write("HDR\tQuickBooks Pro\tVersion 27.0D\tRelease R5P\t1\t2024-01-01\t1700000000\n")
+        # Accounts come first so budgets can refer to them
+        for row_type in sorted(counts, key=lambda row_type: row_type != RowType.ACCNT):
+            columns = iif_columns(row_type)
+            f.write('!' + '\t'.join([row_type.value, *columns]) + '\n')
+            for _ in range(counts[row_type]):
+                values = factory.values(row_type)
+                f.write('\t'.join([row_type.value, *(values.get(column, '') for column in columns)]) + '\n')
+    return counts
+
+
+def generate_register_csv(path: str, rows: int, seed: int = 0):
+    """Writes a synthetic tab-delimited QuickBooks register export as read by csv_to_qif."""
+    rng = random.Random(seed)
+    start = datetime.date(2020, 1, 1)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("Checking Register\n")
+        f.write("Date\tNum\tName\tMemo\tAccount\tC\tAmount\n")
+        for i in range(rows):
+            date = start + datetime.timedelta(days=i % 1500)
+            f.write(f"{date.strftime('%m/%d/%y')}\t{1000 + i}\t{rng.choice(_WORDS)} {rng.choice(_SUFFIXES)}\t"
+                    f"{'Invoice ' + str(i) if rng.random() < 0.5 else ''}\t{rng.choice(_ACCOUNT_ROOTS)}\t"
+                    f"{'X' if rng.random() < 0.8 else ''}\t{rng.uniform(-2000, 2000):.2f}\n")
+
+
+class BenchmarkContext:
+    def __init__(self, workdir: str, rows: int, mix: dict[RowType, int], seed: int):
+        self.workdir = workdir
+        self.rows = rows
+        self.iif_file = os.path.join(workdir, 'input.iif')
+        self.register_file = os.path.join(workdir, 'register.csv')
+        self.section_counts = generate_iif(self.iif_file, rows, mix, seed)
+        generate_register_csv(self.register_file, rows, seed)
+        self._data: Optional[dict[RowType, list]] = None
+
+    @property
+    def data(self) -> dict[RowType, list]:
+        if self._data is None:
+            self._data = parse_iif_file(self.iif_file)
+        return self._data
+
+    def output(self, name: str) -> str:
+        return os.path.join(self.workdir, name)
+
+
+# name -> (function, number of rows it processes)
+BENCHMARKS: dict[str, tuple[Callable[[BenchmarkContext], object], Callable[[BenchmarkContext], int]]] = {}
+
+
+def benchmark(name: str, rows: Callable[[BenchmarkContext], int] = lambda ctx: ctx.rows):
+    def register(func):
+        BENCHMARKS[name] = (func, rows)
+        return func
+    return register
+
+
+@benchmark('parse_iif_file')
+def bench_parse(ctx: BenchmarkContext):
+    parse_iif_file(ctx.iif_file)
+
+
+@benchmark('parse_iif_file_intern')
+def bench_parse_intern(ctx: BenchmarkContext):
+    parse_iif_file(ctx.iif_file, intern=True)
+
+
+@benchmark('parse_iif_file_where')
+def bench_parse_where(ctx: BenchmarkContext):
+    parse_iif_file(ctx.iif_file, where=Query(['VEND.EMAIL']))
+
+
+@benchmark('parse_iif_file_lazy')
+def bench_parse_lazy(ctx: BenchmarkContext):
+    parse_iif_file(ctx.iif_file, lazy=True)
+
+
+@benchmark('parse_export_customers', rows=lambda ctx: ctx.rows)
+def bench_parse_export_customers(ctx: BenchmarkContext):
+    export_customers_to_csv(parse_iif_file(ctx.iif_file), ctx.output('customers.csv'))
+
+
+@benchmark('parse_export_customers_lazy', rows=lambda ctx: ctx.rows)
+def bench_parse_export_customers_lazy(ctx: BenchmarkContext):
+    export_customers_to_csv(parse_iif_file(ctx.iif_file, lazy=True), ctx.output('customers.csv'))
+
+
+@benchmark('export_to_iif')
+def bench_export_iif(ctx: BenchmarkContext):
+    export_to_iif(ctx.data, ctx.output('out.iif'))
+
+
+@benchmark('export_to_jsonl')
+def bench_export_jsonl(ctx: BenchmarkContext):
+    export_to_jsonl(ctx.data, ctx.output('out.jsonl'))
+
+
+@benchmark('export_to_qif', rows=lambda ctx: ctx.section_counts.get(RowType.ACCNT, 0))
+def bench_export_qif(ctx: BenchmarkContext):
+    export_to_qif(ctx.data, ctx.output('out.qif'))
+
+
+@benchmark('export_customers_to_csv', rows=lambda ctx: ctx.section_counts.get(RowType.CUST, 0))
+def bench_export_customers(ctx: BenchmarkContext):
+    export_customers_to_csv(ctx.data, ctx.output('customers.csv'))
+
+
+@benchmark('export_vendors_to_csv', rows=lambda ctx: ctx.section_counts.get(RowType.VEND, 0))
+def bench_export_vendors(ctx: BenchmarkContext):
+    export_vendors_to_csv(ctx.data, ctx.output('vendors.csv'))
+
+
+@benchmark('export_othernames_to_csv', rows=lambda ctx: ctx.section_counts.get(RowType.OTHERNAME, 0))
+def bench_export_othernames(ctx: BenchmarkContext):
+    export_othernames_to_csv(ctx.data, ctx.output('othernames.csv'))
+
+
+@benchmark('roundtrip_vendors_csv', rows=lambda ctx: ctx.section_counts.get(RowType.VEND, 0))
+def bench_roundtrip_vendors_csv(ctx: BenchmarkContext):
+    export_vendors_to_csv(ctx.data, ctx.output('vendors.csv'))
+    csv_to_iif(ctx.output('vendors.csv'), ctx.output('vendors.iif'), RowType.VEND)
+
+
+@benchmark('roundtrip_accounts_qif', rows=lambda ctx: ctx.section_counts.get(RowType.ACCNT, 0))
+def bench_roundtrip_accounts_qif(ctx: BenchmarkContext):
+    export_to_qif(ctx.data, ctx.output('accounts.qif'))
+    qif_to_iif(ctx.output('accounts.qif'), ctx.output('accounts.iif'))
+
+
+@benchmark('pickle_roundtrip')
+def bench_pickle_roundtrip(ctx: BenchmarkContext):
+    pickle.loads(pickle.dumps(ctx.data, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+@benchmark('wire_roundtrip')
+def bench_wire_roundtrip(ctx: BenchmarkContext):
+    iif_wire.loads(iif_wire.dumps(ctx.data))
+
+
+@benchmark('csv_to_qif')
+def bench_csv_to_qif(ctx: BenchmarkContext):
+    csv_to_qif(ctx.register_file, ctx.output('register.qif'))
+
+
+def run_benchmark(name: str, ctx: BenchmarkContext, repeat: int) -> dict:
+    func, rows = BENCHMARKS[name]
+    ctx.data  # parse outside of the timed region for the exporters
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func(ctx)
+        timings.append(time.perf_counter() - start)
+
+    # Peak memory is measured in a separate run, tracing slows everything down
+    gc.collect()
+    tracemalloc.start()
+    func(ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = min(timings)
+    count = rows(ctx)
+    return {
+        'seconds': round(seconds, 6),
+        'rows': count,
+        'rows_per_sec': round(count / seconds, 1) if seconds else None,
+        'peak_mb': round(peak / (1 << 20), 3),
+    }
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lists the benchmarks that got slower or use more memory than the baseline allows."""
+    regressions = []
+    for name, result in results['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        if result['seconds'] > base['seconds'] * (1 + tolerance):
+            regressions.append(f"{name}: {base['seconds']:.4f}s -> {result['seconds']:.4f}s")
+        if result['peak_mb'] > base['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: {base['peak_mb']:.2f}MB -> {result['peak_mb']:.2f}MB peak")
+    return regressions
+
+
+def parse_mix(value: str) -> dict[RowType, int]:
+    mix = {}
+    for item in value.split(','):
+        section, _, weight = item.partition('=')
+        mix[RowType[section.strip().upper()]] = int(weight or 1)
+    return mix
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the IIF parser, exporters and register conversion')
+    parser.add_argument('--rows', type=int, default=100000, help='Number of synthetic records')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, metavar='SECTION=WEIGHT,...',
+                        help='Section mix, e.g. ACCNT=5,CUST=40,VEND=20')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark, the best is reported')
+    parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS), help='Run only these benchmarks')
+    parser.add_argument('--output', help='Write results to a JSON file', metavar='FILE')
+    parser.add_argument('--compare', help='Compare against a baseline results file', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed slowdown before a regression is reported')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        ctx = BenchmarkContext(workdir, args.rows, args.mix, args.seed)
+        results = {
+            'meta': {
+                'rows': args.rows,
+                'mix': {row_type.value: weight for row_type, weight in args.mix.items()},
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'input_bytes': os.path.getsize(ctx.iif_file),
+            },
+            'results': {name: run_benchmark(name, ctx, args.repeat) for name in (args.only or BENCHMARKS)},
+        }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,122 @@
+import datetime
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, Iterator, Optional, TextIO
+
+CHECKPOINT_VERSION = 1
+PROGRESS_INTERVAL = 10.0  # seconds
+PROGRESS_CHECK_ROWS = 1000  # rows between looks at the clock
+
+
+@dataclass
+class Checkpoint:
+    """How far a conversion got, saved so that a restarted run can resume from there.
+
+    The input is identified by its size and modification time.  `offset`,
+    `line_num` and `header` are the parse position, `states` the state() of
+    every sink in pipeline order and `counts` the records converted per
+    section so far.
+    """
+    input_file: str
+    input_size: int
+    input_mtime_ns: int
+    outputs: list[str]
+    encoding: Optional[str] = None
+    offset: int = 0
+    line_num: int = 0
+    header: Optional[str] = None
+    states: list[dict] = field(default_factory=list)
+    counts: dict[str, int] = field(default_factory=dict)
+    version: int = CHECKPOINT_VERSION
+
+    @classmethod
+    def start(cls, input_file: str, outputs: Iterable[str], encoding: Optional[str] = None) -> 'Checkpoint':
+        stat = os.stat(input_file)
+        return cls(input_file, stat.st_size, stat.st_mtime_ns, list(outputs), encoding)
+
+    def matches(self, input_file: str, outputs: Iterable[str]) -> bool:
+        """Whether this checkpoint was saved converting the same, unchanged input to the same outputs."""
+        stat = os.stat(input_file)
+        return ((self.input_size, self.input_mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+                and self.outputs == list(outputs))
+
+    def save(self, path: str):
+        """Writes the checkpoint to disk; a crash while saving leaves the previous one in place."""
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(self), f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['Checkpoint']:
+        """Reads a saved checkpoint, or returns None if there is none."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if data.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Checkpoint '{path}' was written by an incompatible version")
+        return cls(**data)
+
+
+class Progress:
+    """Reports how far a parse is through its input: bytes, rows per second and an ETA.
+
+    `total` is the input size in the same bytes as the offsets passed to
+    update(), or None when it isn't known, as for a compressed input whose
+    offsets count decompressed bytes.  The offsets themselves are None when
+    the parse can't track them (a utf-16 input), leaving only row counts.
+    Rates cover this run only, so a resumed run's ETA isn't skewed by the
+    part done before it.
+    """
+
+    def __init__(self, total: Optional[int], offset: int = 0, rows: int = 0,
+                 out: TextIO = sys.stderr, interval: float = PROGRESS_INTERVAL):
+        self.total = total
+        self.start_offset = offset
+        self.start_rows = rows
+        self.out = out
+        self.interval = interval
+        self.started = time.monotonic()
+        self._next_report = self.started + interval
+
+    def update(self, offset: Optional[int], rows: int):
+        """Prints a progress line if `interval` has passed since the last one."""
+        now = time.monotonic()
+        if now >= self._next_report:
+            self._next_report = now + self.interval
+            print(self.line(offset, rows, now), file=self.out, flush=True)
+
+    def line(self, offset: Optional[int], rows: int, now: Optional[float] = None) -> str:
+        elapsed = max((now or time.monotonic()) - self.started, 1e-9)
+        parts = []
+        if self.total and offset is not None:
+            parts.append(f"{offset / 1e6:.1f} of {self.total / 1e6:.1f} MB ({min(offset / self.total, 1.0):.1%})")
+        elif offset is not None:
+            parts.append(f"{offset / 1e6:.1f} MB")
+        parts.append(f"{self.start_rows + rows} rows")
+        parts.append(f"{rows / elapsed:,.0f} rows/s")
+        byte_rate = (offset - self.start_offset) / elapsed if offset is not None else 0
+        if self.total and byte_rate > 0:
+            remaining = max(self.total - offset, 0) / byte_rate
+            parts.append(f"ETA {datetime.timedelta(seconds=round(remaining))}")
+        return ', '.join(parts)
+
+
+def track_progress(records: Iterable, position, progress: Progress) -> Iterator:
+    """Passes a record stream through, updating `progress` from a ParsePosition the parse keeps current.
+
+    Without a `position`, only rows are reported.
+    """
+    rows = 0
+    for rows, item in enumerate(records, 1):
+        yield item
+        if rows % PROGRESS_CHECK_ROWS == 0:
+            progress.update(position.offset if position else None, rows)
+    print(progress.line(position.offset if position else None, rows), file=progress.out, flush=True)
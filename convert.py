@@ -1,107 +1,279 @@
-
 import csv
 import datetime
-from typing import Optional
+import os
+import sys
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Callable, Iterable, Iterator, Optional
 from iif_data_types import *
-
-def parse_iif_file(file_path: str) -> dict[RowType, list]:
-    data: dict[RowType, list] = {row_type: [] for row_type in RowType}
-    current_section: Optional[RowType] = None
+from field_mapping import ROW_NUMBER, MappingSpec, compile_spec, load_spec, select_columns, write_csv
+from iif_schema import IifWriter, SectionLayout, fidelity_class
+from iif_io import (DECODE_FALLBACK, PREFETCH_BLOCK_SIZE, PREFETCH_QUEUE_DEPTH, LineReader, PrefetchStats,
+                    byte_offsets_supported, compression_for, detect_encoding, open_text)
+from export_pipeline import DEFAULT_CHECKPOINT_INTERVAL, CsvSink, ExportPipeline, IifSink, TextSink
+from sqlite_export import SqliteSink
+from jsonl_export import STDOUT, JsonlSink
+from external_sort import DEFAULT_MEMORY_MB, SORT_KEY_FIELDS, SORT_KEYS, sorted_records
+from checkpoint import Checkpoint, Progress, track_progress
+from iif_query import Query, never
+
+@dataclass
+class ParseIssue:
+    line_num: int
+    section: Optional[str]
+    message: str
+
+
+@dataclass
+class ParseReport:
+    """Problems found by a robust parse, collected instead of raised or printed."""
+    issues: list[ParseIssue] = field(default_factory=list)
+    unknown_sections: dict[str, int] = field(default_factory=dict)  # section -> data lines
+    skipped_lines: int = 0
+    suppressed: int = 0  # issues beyond max_issues, counted but not kept
+    max_issues: int = 1000
+
+    def add(self, line_num: int, section: Optional[str], message: str):
+        self.skipped_lines += 1
+        if len(self.issues) < self.max_issues:
+            self.issues.append(ParseIssue(line_num, section, message))
+        else:
+            self.suppressed += 1
+
+    def summary(self) -> str:
+        parts = [f"{self.skipped_lines} lines skipped"]
+        if self.unknown_sections:
+            parts.append("unknown sections: " + ", ".join(f"{name} ({count})" for name, count in self.unknown_sections.items()))
+        return "; ".join(parts)
+
+
+@dataclass
+class ParsePosition:
+    """Where a parse is in its input: after `line_num` lines and `offset` bytes.
+
+    `header` is the header line of the section being read, which a parse
+    restarted at `offset` needs to decode the data lines that follow.
+    """
+    offset: int = 0
+    line_num: int = 0
+    header: Optional[str] = None
+
+
+def iter_iif_records(file_path: str, robust: bool = False, unknown_sections: str = 'skip',
+                     report: Optional[ParseReport] = None, fidelity: bool = False, lazy: bool = False,
+                     sections: Optional[Iterable[RowType]] = None,
+                     fields: Optional[Iterable[str] | dict[RowType, Iterable[str]]] = None,
+                     threaded: bool = False, block_size: int = PREFETCH_BLOCK_SIZE,
+                     queue_depth: int = PREFETCH_QUEUE_DEPTH, io_stats: Optional[PrefetchStats] = None,
+                     encoding: Optional[str] = None, intern: bool = False,
+                     position: Optional[ParsePosition] = None,
+                     where: Optional[Query] = None) -> Iterator[tuple[RowType | str, object]]:
+    """Streams (row type, record) pairs from an IIF file in file order.
+
+    In robust mode, malformed lines are recorded in `report` and skipped instead
+    of failing the parse.  Data lines of unknown sections are either skipped
+    without being split (unknown_sections='skip') or yielded as GenericRecords
+    keyed by the section name (unknown_sections='keep').
+
+    With fidelity, each record keeps a reference to its section layout and
+    source line so IifWriter can write unchanged records back verbatim.
+
+    With lazy, records hold their split line and decode each field the first
+    time it is read, which pays off when only a few fields are used.
+
+    `sections` limits the parse to those row types; lines of other sections are
+    skipped without being split.  `fields`, either one set of field names or a
+    set per row type, limits decoding to those fields and leaves the rest at
+    their defaults.
+
+    Compressed files (.gz, .xz, .zst) are decompressed on the fly.  With
+    threaded, a reader thread prefetches and decompresses blocks of
+    `block_size` bytes, up to `queue_depth` ahead, while this thread splits and
+    decodes lines; `io_stats` collects how much the two overlapped.
+
+    With no `encoding`, it is detected from a sample of the file before the
+    parse starts (see detect_encoding).  A utf-8 file that turns out to hold
+    stray Windows-1252 bytes further in is decoded as cp1252 for those bytes
+    rather than failing partway through.
+
+    With intern, fields declared intern=True (account types, terms, tax codes
+    and the like) share one string per distinct value instead of holding a
+    copy per record, which shrinks large parses that are kept in memory.  The
+    table is this parse's own, so it is freed with the parse and its records.
+    Lazy records decode their fields after the parse and are not interned.
+
+    With a `position`, the parse starts there and keeps it up to date: each
+    time a record is yielded it describes the point right after that record,
+    so saving it lets a later parse resume where this one stopped.  Lines are
+    then read through a LineReader, and a robust parse's report only covers
+    the lines read from the starting position on.
+
+    With `where`, only records matching the query are yielded.  Sections it
+    can't match are skipped like those left out of `sections`, and the others
+    are checked on their split values before a record is built.  Unknown
+    sections never match a query with predicates.
+    """
+    if unknown_sections not in ('skip', 'keep'):
+        raise ValueError(f"unknown_sections must be 'skip' or 'keep', not {unknown_sections!r}")
+    if robust and report is None:
+        report = ParseReport()
+    keep_unknown = robust and unknown_sections == 'keep' and not where
+    if where:
+        sections = where.sections() if sections is None else frozenset(sections) & where.sections()
+    if sections is not None:
+        sections = frozenset(sections) | {RowType.ENDGRP}
+
+    current_section: Optional[RowType | str] = None
     headers: list[str] = []
-
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        for line_num, line in enumerate(f, start=1):
+    decode = None
+    match = None  # the where check of the current section layout
+    width = 0
+    skipping = False  # inside a section whose lines are skipped without splitting
+    skipped_section: Optional[str] = None  # the unknown section being skipped, for the report
+
+    # Interning decoders are compiled per parse for its own table, once per layout
+    intern_table: Optional[dict] = {} if intern and not lazy else None
+    interning_decoders: dict[tuple, Callable] = {}
+
+    errors = None
+    if encoding is None:
+        encoding = detect_encoding(file_path)
+        errors = DECODE_FALLBACK
+
+    if position is None:
+        f = open_text(file_path, 'r', encoding=encoding, threaded=threaded, block_size=block_size,
+                      queue_depth=queue_depth, stats=io_stats, errors=errors)
+        lines, start = f, 1
+    else:
+        f = LineReader(file_path, encoding, errors, position.offset, threaded, block_size, queue_depth, io_stats)
+        lines, start = f, position.line_num + 1
+        if position.header is not None:
+            # Re-read the header of the section the parse stopped in
+            lines, start = chain((position.header,), f), start - 1
+
+    with f:
+        for line_num, line in enumerate(lines, start=start):
+            if skipping and line[0] != '!':
+                if skipped_section is not None:
+                    report.unknown_sections[skipped_section] += 1
+                continue
             line = line.rstrip('\n')
             if not line:
                 continue  # Skip empty lines
 
             if line.startswith('!'):
                 # New section header with field names
-                current_section_str = line[1:]
-                # Use csv.reader to split the line
-                reader = csv.reader([current_section_str], delimiter='\t', quoting=csv.QUOTE_NONE)
-                headers = next(reader)
+                headers = line[1:].split('\t')
                 line_type = headers[0]
+                if position is not None:
+                    position.header = line
                 current_section = RowType.__members__.get(line_type)
-                if current_section is None:
+                skipping = False
+                skipped_section = None
+                if current_section is not None and sections is not None and current_section not in sections:
+                    skipping = True
+                elif current_section is not None:
+                    section_fields = fields.get(current_section) if isinstance(fields, dict) else fields
+                    record_class = get_class_by_row_type(current_section)
+                    if fidelity:
+                        layout = SectionLayout(record_class, headers)
+                        record_class = fidelity_class(record_class)
+                    if intern_table is None:
+                        # Compiled once per section layout by iif_schema
+                        decode = record_class.decoder_for(headers, lazy, section_fields)
+                    else:
+                        key = (record_class, tuple(headers),
+                               frozenset(section_fields) if section_fields is not None else None)
+                        decode = interning_decoders.get(key)
+                        if decode is None:
+                            decode = record_class.decoder_for(headers, lazy, section_fields, intern_table)
+                            interning_decoders[key] = decode
+                    width = len(headers)
+                    if where and current_section is not RowType.ENDGRP:
+                        match = where.matcher(current_section, headers)
+                        skipping = match is never
+                elif not robust:
                     print(f"Warning: Unknown section '{line_type}' at line {line_num}")
+                else:
+                    current_section = line_type
+                    report.unknown_sections.setdefault(line_type, 0)
+                    if keep_unknown:
+                        shared_headers = tuple(headers)
+                        decode = lambda values: GenericRecord(shared_headers, values)
+                        width = len(headers)
+                    else:
+                        skipping = True
+                        skipped_section = line_type
             elif current_section:
-                # Use csv.reader to split the line
-                reader = csv.reader([line], delimiter='\t', quoting=csv.QUOTE_NONE)
-                values = next(reader)
-                assert len(headers) >= len(values)-1, f"Header and value count mismatch: {headers} {values}"
-
-                record_dict = dict(zip(headers, values))
-
-                # Route to the appropriate class using match
-                match current_section:
-                    case RowType.HDR:
-                        hdr = HDR.from_row(record_dict)
-                        data[RowType.HDR].append(hdr)
-                    case RowType.ACCNT:
-                        account = Account.from_row(record_dict)
-                        data[RowType.ACCNT].append(account)
-                    case RowType.INVITEM:
-                        invitem = InventoryItem.from_row(record_dict)
-                        data[RowType.INVITEM].append(invitem)
-                    case RowType.CLASS:
-                        class_record = ClassRecord.from_row(record_dict)
-                        data[RowType.CLASS].append(class_record)
-                    case RowType.VTYPE:
-                        vtype = VendorType.from_row(record_dict)
-                        data[RowType.VTYPE].append(vtype)
-                    case RowType.EMP:
-                        employee = Employee.from_row(record_dict)
-                        data[RowType.EMP].append(employee)
-                    case RowType.BUD:
-                        budget = Budget.from_row(record_dict)
-                        data[RowType.BUD].append(budget)
-                    case RowType.TODO:
-                        todo_item = ToDoItem.from_row(record_dict)
-                        data[RowType.TODO].append(todo_item)
-                    case RowType.VEHICLE:
-                        vehicle = Vehicle.from_row(record_dict)
-                        data[RowType.VEHICLE].append(vehicle)
-                    case RowType.SALESREP:
-                        sales_rep = SalesRep.from_row(record_dict)
-                        data[RowType.SALESREP].append(sales_rep)
-                    case RowType.CTYPE:
-                        ctype = CustomerType.from_row(record_dict)
-                        data[RowType.CTYPE].append(ctype)
-                    case RowType.CUST:
-                        customer = Customer.from_row(record_dict)
-                        data[RowType.CUST].append(customer)
-                    case RowType.VEND:
-                        vendor = Vendor.from_row(record_dict)
-                        data[RowType.VEND].append(vendor)
-                    case RowType.SHIPMETH:
-                        ship_meth = ShippingMethod.from_row(record_dict)
-                        data[RowType.SHIPMETH].append(ship_meth)
-                    case RowType.PAYMETH:
-                        pay_meth = PaymentMethod.from_row(record_dict)
-                        data[RowType.PAYMETH].append(pay_meth)
-                    case RowType.TERMS:
-                        terms = Terms.from_row(record_dict)
-                        data[RowType.TERMS].append(terms)
-                    case RowType.SALESTAXCODE:
-                        stc = SalesTaxCode.from_row(record_dict)
-                        data[RowType.SALESTAXCODE].append(stc)
-                    case RowType.ENDGRP:
-                        current_section = None  # End of group
-                    case RowType.OTHERNAME:
-                        othername = OtherName.from_row(record_dict)
-                        data[RowType.OTHERNAME].append(othername)
-                        
-                    case _:
-                        assert False, f"Unknown row type: {current_section}"
+                values = line.split('\t')
+                if len(headers) < len(values)-1:
+                    if not robust:
+                        assert False, f"Header and value count mismatch: {headers} {values}"
+                    report.add(line_num, headers[0], f"{len(values)} values for {len(headers)} columns")
+                    continue
+
+                if current_section is RowType.ENDGRP:
+                    current_section = None  # End of group
+                    continue
+                if len(values) < width:
+                    values.extend([''] * (width - len(values)))
+                if match is not None and not match(values):
+                    continue
+                if not robust:
+                    record = decode(values)
+                else:
+                    try:
+                        record = decode(values)
+                    except Exception as e:
+                        report.add(line_num, headers[0], f"Could not decode record: {e}")
+                        continue
+                if fidelity and type(current_section) is RowType:
+                    record.__dict__['_iif_source'] = (layout, line)
+                if keep_unknown and type(current_section) is str:
+                    report.unknown_sections[current_section] += 1
+                if position is not None:
+                    position.offset, position.line_num = f.offset, line_num
+                yield current_section, record
+            elif robust:
+                report.add(line_num, None, "Data line outside of any section")
             else:
                 assert False, f"No current section: {line}"
 
+
+def parse_iif_file(file_path: str, robust: bool = False, unknown_sections: str = 'skip',
+                   report: Optional[ParseReport] = None, fidelity: bool = False, lazy: bool = False,
+                   sections: Optional[Iterable[RowType]] = None,
+                   fields: Optional[Iterable[str] | dict[RowType, Iterable[str]]] = None,
+                   threaded: bool = False, block_size: int = PREFETCH_BLOCK_SIZE,
+                   queue_depth: int = PREFETCH_QUEUE_DEPTH,
+                   io_stats: Optional[PrefetchStats] = None,
+                   encoding: Optional[str] = None, intern: bool = False,
+                   where: Optional[Query] = None) -> dict[RowType, list]:
+    """Parses an IIF file into lists of records by row type.
+
+    With robust=True and unknown_sections='keep', records of unknown sections
+    are added under their section name.
+    """
+    data: dict[RowType, list] = {row_type: [] for row_type in RowType}
+    for row_type, record in iter_iif_records(file_path, robust, unknown_sections, report, fidelity, lazy,
+                                              sections, fields, threaded, block_size, queue_depth, io_stats,
+                                              encoding, intern, where=where):
+        records = data.get(row_type)
+        if records is None:
+            records = data[row_type] = []
+        records.append(record)
     return data
 
 
-def export_to_iif(data: dict[RowType, list], output_file: str):
-    with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+def export_to_iif(data: dict[RowType, list], output_file: str, fidelity: bool = False):
+    """Writes records as IIF, one section per row type.
+
+    With fidelity, records parsed with fidelity=True are written under their
+    original headers, unchanged ones as a verbatim copy of their source line,
+    and empty sections are left out.
+    """
+    with open_text(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = IifWriter(f, fidelity=fidelity)
         for row_type in RowType:
             records = data.get(row_type, [])
 
@@ -110,148 +282,187 @@ def export_to_iif(data: dict[RowType, list], output_file: str):
             if not record_class:
                 assert False, f"Unknown row type: {row_type}"
 
-            # Write the section header with field names, starting with '!'
-            header_fields = record_class.to_iif_header()
-            f.write(header_fields + '\n')
+            if not fidelity:
+                # Every section gets its canonical header, even an empty one
+                writer.write_header(record_class.to_iif_header())
+            writer.write_records(records)
+
+        # Sections kept from a robust parse, written with their original headers
+        for section, records in data.items():
+            if not isinstance(section, RowType):
+                writer.write_records(records)
+
+
+# Maps custom account types to GnuCash-compatible QIF account types
+ACCOUNT_TYPE_MAPPING = {
+    'EXEXP': 'Oth A',     # Other Asset for Expenses
+    'EXINC': 'Oth A',     # Other Asset for Income
+    'EXP': 'Oth A',       # Other Asset for Expenses
+    'INC': 'Oth A',       # Other Asset for Income
+    'EQUITY': 'Oth A',    # Other Asset for Equity
+    'LTLIAB': 'Oth L',    # Other Liability for Long-Term Liabilities
+    'OCLIAB': 'Oth L',    # Other Liability for Other Current Liabilities
+    'FIXASSET': 'Oth A',  # Other Asset for Fixed Assets
+    'OCASSET': 'Oth A',   # Other Asset for Other Current Assets
+}
 
-            # Write the data lines
-            for record in records:
-                f.write(record.to_iif_row() + '\n')
 
 def map_account_type(account_type: str) -> str:
     """Maps custom account types to GnuCash-compatible QIF account types."""
-    mapping = {
-        'EXEXP': 'Oth A',     # Other Asset for Expenses
-        'EXINC': 'Oth A',     # Other Asset for Income
-        'EXP': 'Oth A',       # Other Asset for Expenses
-        'INC': 'Oth A',       # Other Asset for Income
-        'EQUITY': 'Oth A',    # Other Asset for Equity
-        'LTLIAB': 'Oth L',    # Other Liability for Long-Term Liabilities
-        'OCLIAB': 'Oth L',    # Other Liability for Other Current Liabilities
-        'FIXASSET': 'Oth A',  # Other Asset for Fixed Assets
-        'OCASSET': 'Oth A',   # Other Asset for Other Current Assets
-    }
-    return mapping.get(account_type, 'Bank')  # Default to Bank if not mapped
+    return ACCOUNT_TYPE_MAPPING.get(account_type, 'Bank')  # Default to Bank if not mapped
 
 
-def export_to_qif(data: dict[RowType, list], output_file: str):
-    with open(output_file, 'w', encoding='utf-8') as f:
-        accounts = data.get(RowType.ACCNT, [])
-        for account in accounts:
-            # Map the account type to GnuCash-compatible type
-            account_type = map_account_type(account.ACCNTTYPE)
-            
-            # Write the account header
-            f.write("!Account\n")
-            f.write(f"N{account.NAME}\n")
-            f.write(f"T{account_type}\n")
-            if account.DESC:
-                f.write(f"D{account.DESC}\n")
-            f.write("^\n")
-
-            # Start a new section for transactions (empty if no transactions)
-            f.write(f"!Type:{account_type.lower()}\n")
-
-            # Include opening balance as a transaction if necessary
-            if account.OBAMOUNT:
-                f.write(f"D{datetime.datetime.now().strftime('%m/%d/%Y')}\n")
-                f.write(f"T{account.OBAMOUNT}\n")
-                f.write("C*\n")  # Cleared status
-                f.write("MOpening Balance\n")
-                f.write("^\n")
-
-
-def export_vendors_to_csv(data: dict[RowType, list], output_file: str):
-    import csv
-
-    vendors = data.get(RowType.VEND, [])
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = [
-            'ID', 'Company', 'Name', 'Address1', 'Address2', 'Address3', 'Address4',
-            'Phone', 'Fax', 'Email', 'Notes', 'Shipping Name', 'Shipping Address1',
-            'Shipping Address2', 'Shipping Address3', 'Shipping Address4',
-            'Shipping Phone', 'Shipping Fax', 'Shipping Email'
-        ]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        writer.writeheader()
-        for idx, vendor in enumerate(vendors, start=1):
-            writer.writerow({
-                'ID': idx,
-                'Company': vendor.COMPANYNAME or '',
-                'Name': vendor.NAME,
-                'Address1': vendor.ADDR1 or '',
-                'Address2': vendor.ADDR2 or '',
-                'Address3': vendor.ADDR3 or '',
-                'Address4': vendor.ADDR4 or '',
-                'Phone': vendor.PHONE1 or '',
-                'Fax': vendor.FAXNUM or '',
-                'Email': vendor.EMAIL or '',
-                'Notes': vendor.NOTEPAD or '',
-                'Shipping Name': '',
-                'Shipping Address1': '',
-                'Shipping Address2': '',
-                'Shipping Address3': '',
-                'Shipping Address4': '',
-                'Shipping Phone': '',
-                'Shipping Fax': '',
-                'Shipping Email': ''
-            })
-
-def export_othernames_to_csv(data: dict[RowType, list], output_file: str):
-    import csv
-
-    other_names = data.get(RowType.OTHERNAME, [])
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = [
-            'ID', 'Company', 'Name', 'Address1', 'Address2', 'Address3', 'Address4',
-            'Phone', 'Fax', 'Email', 'Notes', 'Shipping Name', 'Shipping Address1',
-            'Shipping Address2', 'Shipping Address3', 'Shipping Address4',
-            'Shipping Phone', 'Shipping Fax', 'Shipping Email'
-        ]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        writer.writeheader()
-        for idx, othername in enumerate(other_names, start=1):
-            writer.writerow({
-                'ID': idx,
-                'Company': othername.COMPANYNAME or '',
-                'Name': othername.NAME,
-                'Address1': othername.BADDR1 or '',
-                'Address2': othername.BADDR2 or '',
-                'Address3': othername.BADDR3 or '',
-                'Address4': othername.BADDR4 or '',
-                'Phone': othername.PHONE1 or '',
-                'Fax': othername.FAXNUM or '',
-                'Email': othername.EMAIL or '',
-                'Notes': othername.NOTEPAD or '',
-                'Shipping Name': '',
-                'Shipping Address1': '',
-                'Shipping Address2': '',
-                'Shipping Address3': '',
-                'Shipping Address4': '',
-                'Shipping Phone': '',
-                'Shipping Fax': '',
-                'Shipping Email': ''
-            })
-
-
-def export_customers_to_csv(data: dict[RowType, list], output_file: str):
-
-    customers = data.get(RowType.CUST, [])
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['Name', 'Address', 'Phone', 'Email']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        writer.writeheader()
-        for customer in customers:
-            writer.writerow({
-                'Name': customer.NAME,
-                'Address': f"{customer.BADDR1 or ''} {customer.BADDR2 or ''} {customer.BADDR3 or ''} {customer.BADDR4 or ''} {customer.BADDR5 or ''}",
-                'Phone': customer.PHONE1 or '',
-                'Email': customer.EMAIL or '',
-            })
+# The Account fields read by account_to_qif
+QIF_ACCOUNT_FIELDS = ('NAME', 'ACCNTTYPE', 'DESC', 'OBAMOUNT')
+
+
+def account_to_qif(account: Account) -> str:
+    # Map the account type to GnuCash-compatible type
+    account_type = map_account_type(account.ACCNTTYPE)
+
+    # Write the account header
+    parts = ["!Account\n", f"N{account.NAME}\n", f"T{account_type}\n"]
+    if account.DESC:
+        parts.append(f"D{account.DESC}\n")
+    parts.append("^\n")
+
+    # Start a new section for transactions (empty if no transactions)
+    parts.append(f"!Type:{account_type.lower()}\n")
 
+    # Include opening balance as a transaction if necessary
+    if account.OBAMOUNT:
+        parts.append(f"D{datetime.datetime.now().strftime('%m/%d/%Y')}\n")
+        parts.append(f"T{account.OBAMOUNT}\n")
+        parts.append("C*\n")  # Cleared status
+        parts.append("MOpening Balance\n")
+        parts.append("^\n")
+    return ''.join(parts)
+
+
+def export_to_qif(data: dict[RowType, list], output_file: str):
+    with open_text(output_file, 'w', encoding='utf-8') as f:
+        f.writelines(map(account_to_qif, data.get(RowType.ACCNT, [])))
+
+
+SHIPPING_CSV_SPEC = [
+    ('Shipping Name', None),
+    ('Shipping Address1', None),
+    ('Shipping Address2', None),
+    ('Shipping Address3', None),
+    ('Shipping Address4', None),
+    ('Shipping Phone', None),
+    ('Shipping Fax', None),
+    ('Shipping Email', None),
+]
+
+VENDOR_CSV_SPEC = [
+    ('ID', ROW_NUMBER),
+    ('Company', 'COMPANYNAME'),
+    ('Name', 'NAME'),
+    ('Address1', 'ADDR1'),
+    ('Address2', 'ADDR2'),
+    ('Address3', 'ADDR3'),
+    ('Address4', 'ADDR4'),
+    ('Phone', 'PHONE1'),
+    ('Fax', 'FAXNUM'),
+    ('Email', 'EMAIL'),
+    ('Notes', 'NOTEPAD'),
+    *SHIPPING_CSV_SPEC,
+]
+
+OTHERNAME_CSV_SPEC = [
+    ('ID', ROW_NUMBER),
+    ('Company', 'COMPANYNAME'),
+    ('Name', 'NAME'),
+    ('Address1', 'BADDR1'),
+    ('Address2', 'BADDR2'),
+    ('Address3', 'BADDR3'),
+    ('Address4', 'BADDR4'),
+    ('Phone', 'PHONE1'),
+    ('Fax', 'FAXNUM'),
+    ('Email', 'EMAIL'),
+    ('Notes', 'NOTEPAD'),
+    *SHIPPING_CSV_SPEC,
+]
+
+# The default customer export reads few enough fields for --lazy to pay off
+CUSTOMER_CSV_SPEC = [
+    ('ID', ROW_NUMBER),
+    ('Name', 'NAME'),
+    ('Company', 'COMPANYNAME'),
+    *((f'Billing Address{i}', f'BADDR{i}') for i in range(1, 6)),
+    *((f'Shipping Address{i}', f'SADDR{i}') for i in range(1, 6)),
+    ('Phone', 'PHONE1'),
+    ('Email', 'EMAIL'),
+]
+
+# Every customer field in its own column, the same names as the default spec
+CUSTOMER_FULL_CSV_SPEC = [
+    ('ID', ROW_NUMBER),
+    ('Name', 'NAME'),
+    ('Company', 'COMPANYNAME'),
+    ('Salutation', 'SALUTATION'),
+    ('First Name', 'FIRSTNAME'),
+    ('Middle Initial', 'MIDINIT'),
+    ('Last Name', 'LASTNAME'),
+    ('Contact', 'CONT1'),
+    ('Alt Contact', 'CONT2'),
+    *((f'Billing Address{i}', f'BADDR{i}') for i in range(1, 6)),
+    *((f'Shipping Address{i}', f'SADDR{i}') for i in range(1, 6)),
+    ('Phone', 'PHONE1'),
+    ('Alt Phone', 'PHONE2'),
+    ('Fax', 'FAXNUM'),
+    ('Email', 'EMAIL'),
+    ('Type', 'CTYPE'),
+    ('Terms', 'TERMS'),
+    ('Rep', 'REP'),
+    ('Credit Limit', 'LIMIT'),
+    ('Taxable', 'TAXABLE'),
+    ('Sales Tax Code', 'SALESTAXCODE'),
+    ('Tax Item', 'TAXITEM'),
+    ('Resale Number', 'RESALENUM'),
+    ('Notes', 'NOTEPAD'),
+    *((f'Custom Field{i}', f'CUSTFLD{i}') for i in range(1, 16)),
+    ('Job Description', 'JOBDESC'),
+    ('Job Type', 'JOBTYPE'),
+    ('Job Status', 'JOBSTATUS'),
+    ('Job Start', 'JOBSTART'),
+    ('Job Projected End', 'JOBPROJEND'),
+    ('Job End', 'JOBEND'),
+]
+
+CSV_SPECS = {
+    'customers': CUSTOMER_CSV_SPEC,
+    'vendors': VENDOR_CSV_SPEC,
+    'othernames': OTHERNAME_CSV_SPEC,
+}
+
+# Every column each export can write, to pick from with --columns
+CSV_COLUMNS = {**CSV_SPECS, 'customers': CUSTOMER_FULL_CSV_SPEC}
+
+# The row type each CSV export writes
+CSV_ROW_TYPES = {
+    'customers': RowType.CUST,
+    'vendors': RowType.VEND,
+    'othernames': RowType.OTHERNAME,
+}
+
+VENDOR_CSV = compile_spec(VENDOR_CSV_SPEC)
+OTHERNAME_CSV = compile_spec(OTHERNAME_CSV_SPEC)
+CUSTOMER_CSV = compile_spec(CUSTOMER_CSV_SPEC)
+CUSTOMER_FULL_CSV = compile_spec(CUSTOMER_FULL_CSV_SPEC)
+
+
+def export_vendors_to_csv(data: dict[RowType, list], output_file: str, spec: Optional[MappingSpec] = None):
+    write_csv(data.get(RowType.VEND, []), output_file, spec or VENDOR_CSV)
+
+
+def export_othernames_to_csv(data: dict[RowType, list], output_file: str, spec: Optional[MappingSpec] = None):
+    write_csv(data.get(RowType.OTHERNAME, []), output_file, spec or OTHERNAME_CSV)
+
+
+def export_customers_to_csv(data: dict[RowType, list], output_file: str, spec: Optional[MappingSpec] = None):
+    write_csv(data.get(RowType.CUST, []), output_file, spec or CUSTOMER_CSV)
 
 
 def csv_to_qif(input_csv: str, output_qif: str):
@@ -262,7 +473,7 @@ def csv_to_qif(input_csv: str, output_qif: str):
     :param output_qif: Path to the output QIF file.
     """
     # Open the input CSV and output QIF files
-    with open(input_csv, 'r', encoding='utf-8') as csv_file, open(output_qif, 'w', encoding='utf-8') as qif_file:
+    with open_text(input_csv, 'r', encoding='utf-8') as csv_file, open_text(output_qif, 'w', encoding='utf-8') as qif_file:
         reader = csv.reader(csv_file, delimiter='\t')
 
         title = None
@@ -324,28 +535,183 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description='Convert IIF file to various formats')
     parser.add_argument('input_file', help='Input IIF file path')
+    parser.add_argument('--iif', help='Export to IIF file', metavar='FILE')
+    parser.add_argument('--fidelity', action='store_true',
+                        help='Keep the original column layout and extra columns in the --iif export')
     parser.add_argument('--qif', help='Export to QIF file', metavar='FILE')
-    parser.add_argument('--customers', help='Export customers to CSV file', metavar='FILE') 
+    parser.add_argument('--customers', help='Export customers to CSV file', metavar='FILE')
+    parser.add_argument('--full-customers', action='store_true',
+                        help='Write every customer field in the customers export, not just names and addresses')
     parser.add_argument('--vendors', help='Export vendors to CSV file', metavar='FILE')
     parser.add_argument('--othernames', help='Export other names to CSV file', metavar='FILE')
+    parser.add_argument('--jsonl', help="Export all records as JSON Lines ('-' for stdout)", metavar='FILE')
+    parser.add_argument('--sqlite', help='Export all records to a SQLite database', metavar='FILE')
+    parser.add_argument('--sqlite-incremental', action='store_true',
+                        help='Upsert into an existing --sqlite database by REFNUM and TIMESTAMP')
+    parser.add_argument('--encoding', help='Input file encoding (default: detected from the file)')
+    parser.add_argument('--threaded', action='store_true',
+                        help='Read and decompress the input on a separate prefetching thread')
+    parser.add_argument('--block-size', type=int, default=PREFETCH_BLOCK_SIZE, metavar='BYTES',
+                        help='Size of the blocks read ahead by --threaded')
+    parser.add_argument('--queue-depth', type=int, default=PREFETCH_QUEUE_DEPTH, metavar='BLOCKS',
+                        help='Number of blocks --threaded may read ahead')
+    parser.add_argument('--io-stats', action='store_true',
+                        help='Print how much --threaded reading overlapped with parsing')
+    parser.add_argument('--lazy', action='store_true', help='Decode record fields only when an export reads them')
+    parser.add_argument('--intern', action='store_true',
+                        help='Share one copy of repeated type, terms and tax code values between records')
+    parser.add_argument('--sort-by', choices=sorted(SORT_KEYS),
+                        help='Sort the records of each section for every export, parents before sub-accounts by NAME')
+    parser.add_argument('--sort-memory', type=int, default=DEFAULT_MEMORY_MB, metavar='MB',
+                        help='Memory for --sort-by before sorted runs are spilled to temporary files')
+    parser.add_argument('--sort-workers', type=int, default=1, metavar='N',
+                        help='Processes sorting the spilled runs of --sort-by')
+    parser.add_argument('--robust', action='store_true',
+                        help='Skip malformed lines and unknown sections, reporting them instead of failing')
+    parser.add_argument('--unknown-sections', choices=['skip', 'keep'], default='skip',
+                        help='In robust mode, skip unknown sections or keep them as generic records')
+    parser.add_argument('--report', help='Write the robust parse report to a JSON file', metavar='FILE')
+    parser.add_argument('--progress', action='store_true',
+                        help='Print bytes processed out of the input size, rows per second and an ETA to stderr')
+    parser.add_argument('--checkpoint', metavar='FILE',
+                        help='Save checkpoints to FILE while converting, and resume from it if it exists')
+    parser.add_argument('--checkpoint-interval', type=float, default=DEFAULT_CHECKPOINT_INTERVAL, metavar='SECONDS',
+                        help='Time between --checkpoint saves')
+    parser.add_argument('--where', action='append', default=[], metavar='[SECTION.]FIELD[OP VALUE]',
+                        help='Only export records matching this predicate, e.g. VEND.EMAIL, ACCNTTYPE=EXP, '
+                             'CTYPE=Retail|Online, LIMIT>=5000 or NAME~smith; repeat to require several. '
+                             'A record is kept when every predicate applies to its section and holds')
+    parser.add_argument('--mapping', action='append', default=[], metavar='EXPORT=FILE',
+                        help='Use a JSON column mapping spec for the customers, vendors or othernames export')
+    parser.add_argument('--columns', action='append', default=[], metavar='EXPORT=COLUMN,...',
+                        help='Only write these columns, in this order, in the customers, vendors or othernames export')
     
     args = parser.parse_args()
-
-    data = parse_iif_file(args.input_file)
-    
-    # Print summary
-    for k, v in data.items():
-        print(f"{k}: {len(v)}")
-    print(f"{len(data)} categories")
-    num_records = sum(len(records) for records in data.values())
-    print(f"{num_records} records")
-
+    try:
+        where = Query(args.where)
+    except ValueError as e:
+        parser.error(str(e))
+    mappings = {}
+    for mapping in args.mapping:
+        export_name, _, spec_file = mapping.partition('=')
+        if export_name not in CSV_SPECS or not spec_file:
+            parser.error(f"Invalid --mapping '{mapping}'")
+        try:
+            mappings[export_name] = load_spec(spec_file, get_class_by_row_type(CSV_ROW_TYPES[export_name]))
+        except ValueError as e:
+            parser.error(str(e))
+    for selection in args.columns:
+        export_name, _, columns = selection.partition('=')
+        if export_name not in CSV_SPECS or not columns:
+            parser.error(f"Invalid --columns '{selection}'")
+        try:
+            mappings[export_name] = select_columns(mappings.get(export_name) or CSV_COLUMNS[export_name],
+                                                   columns.split(','))
+        except ValueError as e:
+            parser.error(str(e))
+
+    # Register every requested export as a sink and stream the file through them once
+    pipeline = ExportPipeline()
+    if args.iif:
+        pipeline.add_sink(IifSink(args.iif, fidelity=args.fidelity))
     if args.qif:
-        export_to_qif(data, args.qif)
+        pipeline.add_sink(TextSink(args.qif, [RowType.ACCNT], account_to_qif, fields=QIF_ACCOUNT_FIELDS))
     if args.customers:
-        export_customers_to_csv(data, args.customers)
+        default_spec = CUSTOMER_FULL_CSV if args.full_customers else CUSTOMER_CSV
+        pipeline.add_sink(CsvSink(args.customers, RowType.CUST, mappings.get('customers') or default_spec))
     if args.othernames:
-        export_othernames_to_csv(data, args.othernames)
+        pipeline.add_sink(CsvSink(args.othernames, RowType.OTHERNAME, mappings.get('othernames') or OTHERNAME_CSV))
     if args.vendors:
-        export_vendors_to_csv(data, args.vendors)
-
+        pipeline.add_sink(CsvSink(args.vendors, RowType.VEND, mappings.get('vendors') or VENDOR_CSV))
+    if args.jsonl:
+        pipeline.add_sink(JsonlSink(args.jsonl))
+    if args.sqlite:
+        pipeline.add_sink(SqliteSink(args.sqlite, incremental=args.sqlite_incremental))
+
+    # Only parse the sections and decode the fields that some export reads
+    sections = pipeline.sections() if pipeline.sinks else None
+    fields = pipeline.fields() if pipeline.sinks else None
+    if args.sort_by and fields:
+        # The sort key has to be decoded even when no export reads it
+        key_fields = SORT_KEY_FIELDS[args.sort_by]
+        fields = {row_type: None if needed is None else needed | key_fields for row_type, needed in fields.items()}
+
+    # Progress and checkpoints both follow the parse by its byte offset in the input
+    position = None
+    if args.progress or args.checkpoint:
+        if byte_offsets_supported(args.encoding or detect_encoding(args.input_file)):
+            position = ParsePosition()
+        elif args.checkpoint:
+            parser.error("--checkpoint can't track its position in a UTF-16 input")
+    checkpoint = None
+    done_counts: dict[RowType | str, int] = {}
+    if args.checkpoint:
+        if args.sort_by:
+            parser.error('--checkpoint cannot be combined with --sort-by')
+        if not pipeline.resumable():
+            parser.error('--checkpoint needs uncompressed output files, no stdout and --sqlite-incremental')
+        outputs = [getattr(sink, 'output_file', None) or sink.database for sink in pipeline.sinks]
+        try:
+            checkpoint = Checkpoint.load(args.checkpoint)
+        except ValueError as e:
+            parser.error(str(e))
+        if checkpoint is None:
+            checkpoint = Checkpoint.start(args.input_file, outputs, args.encoding)
+        elif not checkpoint.matches(args.input_file, outputs):
+            parser.error(f"Checkpoint '{args.checkpoint}' is for another input file or other outputs, "
+                         f"remove it to start over")
+        else:
+            print(f"Resuming at line {checkpoint.line_num}, byte {checkpoint.offset}", file=sys.stderr)
+            position = ParsePosition(checkpoint.offset, checkpoint.line_num, checkpoint.header)
+            for sink, state in zip(pipeline.sinks, checkpoint.states):
+                sink.resume_state = state
+            done_counts = {RowType.__members__.get(name, name): n for name, n in checkpoint.counts.items()}
+
+    report = ParseReport() if args.robust or args.report else None
+    io_stats = PrefetchStats() if args.io_stats else None
+    records = iter_iif_records(args.input_file, report is not None, args.unknown_sections, report,
+                               fidelity=args.fidelity, lazy=args.lazy, sections=sections, fields=fields,
+                               threaded=args.threaded or args.io_stats, block_size=args.block_size,
+                               queue_depth=args.queue_depth, io_stats=io_stats,
+                               encoding=checkpoint.encoding if checkpoint else args.encoding,
+                               intern=args.intern, position=position, where=where)
+    if args.sort_by:
+        records = sorted_records(records, args.sort_by, args.sort_memory, args.sort_workers)
+    if args.progress:
+        # Offsets count decompressed bytes, so a compressed input's size says nothing about them
+        total = None
+        if position is not None and compression_for(args.input_file) is None:
+            total = os.path.getsize(args.input_file)
+        records = track_progress(records, position, Progress(total, position.offset if position else 0,
+                                                             sum(done_counts.values())))
+
+    def save_checkpoint(states: list[dict], counts: dict[RowType | str, int]):
+        checkpoint.offset, checkpoint.line_num, checkpoint.header = position.offset, position.line_num, position.header
+        checkpoint.states = states
+        checkpoint.counts = {getattr(k, 'value', k): done_counts.get(k, 0) + counts.get(k, 0)
+                             for k in {**done_counts, **counts}}
+        checkpoint.save(args.checkpoint)
+
+    counts = pipeline.run(records, save_checkpoint if checkpoint else None, args.checkpoint_interval)
+    for k, n in done_counts.items():
+        counts[k] = counts.get(k, 0) + n
+    if checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)  # finished, a rerun starts over
+
+    # Print summary, out of the way of a JSON Lines stream on stdout
+    summary = sys.stderr if args.jsonl == STDOUT else sys.stdout
+    for k, v in counts.items():
+        print(f"{k}: {v}", file=summary)
+    print(f"{len(counts)} categories", file=summary)
+    num_records = sum(counts.values())
+    print(f"{num_records} records", file=summary)
+
+    if io_stats is not None:
+        print(io_stats.summary(), file=sys.stderr)
+    if report is not None:
+        print(report.summary(), file=sys.stderr)
+        if args.report:
+            import json
+            from dataclasses import asdict
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(asdict(report), f, indent=2)
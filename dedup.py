@@ -0,0 +1,233 @@
+import csv
+import multiprocessing
+import os
+import re
+from collections import defaultdict
+from itertools import combinations, islice
+from typing import Iterator, NamedTuple, Optional
+
+from iif_data_types import *
+from convert import iter_iif_records
+from iif_io import open_text
+
+NAME_SECTIONS = (RowType.CUST, RowType.VEND, RowType.OTHERNAME)
+NAME_FIELDS = ('NAME', 'REFNUM', 'COMPANYNAME', 'EMAIL', 'PHONE1')
+
+DEFAULT_THRESHOLD = 0.85
+PHONE_MATCH_SCORE = 0.9
+MAX_BLOCK_SIZE = 200  # larger blocks are compared within a sliding window only
+WINDOW_SIZE = 20
+BLOCKS_PER_TASK = 500
+
+_LEGAL_SUFFIXES = frozenset({'inc', 'incorporated', 'llc', 'ltd', 'limited', 'co', 'corp', 'corporation',
+                             'company', 'plc', 'lp', 'llp', 'pc'})
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+_NON_DIGIT = re.compile(r'\D+')
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lower cases a name, drops punctuation and legal suffixes such as Inc or LLC."""
+    tokens = _NON_WORD.sub(' ', (name or '').lower()).split()
+    while len(tokens) > 1 and tokens[-1] in _LEGAL_SUFFIXES:
+        tokens.pop()
+    if len(tokens) > 1 and tokens[0] == 'the':
+        tokens.pop(0)
+    return ' '.join(tokens)
+
+
+def normalize_email(email: Optional[str]) -> str:
+    return (email or '').strip().lower()
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """Keeps the last ten digits, so country prefixes and formatting don't matter."""
+    return _NON_DIGIT.sub('', phone or '')[-10:]
+
+
+def trigrams(text: str) -> frozenset[str]:
+    padded = f'  {text} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class Entity(NamedTuple):
+    section: RowType
+    refnum: Optional[int]
+    name: str
+    company: str
+    email: str
+    phone: str
+    key_name: str
+    key_company: str
+    key_email: str
+    key_phone: str
+    name_grams: frozenset[str]
+    company_grams: frozenset[str]
+
+
+def make_entity(section: RowType, record) -> Entity:
+    key_name = normalize_name(record.NAME)
+    key_company = normalize_name(record.COMPANYNAME)
+    return Entity(section, record.REFNUM, record.NAME or '', record.COMPANYNAME or '', record.EMAIL or '',
+                  record.PHONE1 or '', key_name, key_company, normalize_email(record.EMAIL),
+                  normalize_phone(record.PHONE1), trigrams(key_name), trigrams(key_company) if key_company else frozenset())
+
+
+def blocking_keys(entity: Entity) -> set[str]:
+    """Keys shared by every plausible duplicate of an entity; only entities sharing a key are compared."""
+    keys = set()
+    if entity.key_email:
+        keys.add('e' + entity.key_email)
+    if len(entity.key_phone) >= 7:
+        keys.add('p' + entity.key_phone)
+    for name in (entity.key_name, entity.key_company):
+        if name:
+            keys.add('n' + name.replace(' ', '')[:4])
+            keys.add('s' + ''.join(sorted(name.split()))[:6])
+    return keys
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+def match_score(a: Entity, b: Entity) -> float:
+    """Scores two entities from 0 to 1; an equal email is a certain match."""
+    if a.key_email and a.key_email == b.key_email:
+        return 1.0
+    score = max(_jaccard(a.name_grams, b.name_grams),
+                _jaccard(a.company_grams, b.company_grams),
+                _jaccard(a.name_grams, b.company_grams),
+                _jaccard(a.company_grams, b.name_grams))
+    if a.key_phone and a.key_phone == b.key_phone:
+        score = max(score, PHONE_MATCH_SCORE)
+    return score
+
+
+def _block_pairs(entities: list[Entity], block: list[int]) -> Iterator[tuple[int, int]]:
+    if len(block) <= MAX_BLOCK_SIZE:
+        yield from combinations(block, 2)
+        return
+    # Sorted neighbourhood: compare each entity with the next few in name order
+    block = sorted(block, key=lambda i: entities[i].key_name)
+    for pos, i in enumerate(block):
+        for j in block[pos + 1:pos + 1 + WINDOW_SIZE]:
+            yield i, j
+
+
+_entities: list[Entity] = []
+_threshold = DEFAULT_THRESHOLD
+
+
+def _init_worker(entities: list[Entity], threshold: float):
+    global _entities, _threshold
+    _entities, _threshold = entities, threshold
+
+
+def _score_blocks(blocks: list[list[int]]) -> list[tuple[int, int, float]]:
+    entities, threshold = _entities, _threshold
+    matches = []
+    for block in blocks:
+        for i, j in _block_pairs(entities, block):
+            score = match_score(entities[i], entities[j])
+            if score >= threshold:
+                matches.append((i, j, score))
+    return matches
+
+
+def _chunks(items: list, size: int) -> Iterator[list]:
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def find_duplicates(entities: list[Entity], threshold: float = DEFAULT_THRESHOLD,
+                    workers: Optional[int] = None) -> list[list[int]]:
+    """Groups entities that match directly or through a chain of matches.
+
+    Candidate pairs come from blocking keys rather than all pairs, and the
+    blocks are scored on `workers` processes, spawned rather than forked
+    since the caller may be running threads.  Returns the groups of two or
+    more entities as lists of indexes, each in ascending order.
+    """
+    blocks: dict[str, list[int]] = defaultdict(list)
+    for i, entity in enumerate(entities):
+        for key in blocking_keys(entity):
+            blocks[key].append(i)
+    candidates = [block for block in blocks.values() if len(block) > 1]
+    # Biggest blocks first so a slow block doesn't finish last on its own
+    candidates.sort(key=len, reverse=True)
+    tasks = _chunks(candidates, BLOCKS_PER_TASK)
+
+    groups = UnionFind(len(entities))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(entities, threshold)
+        for matches in map(_score_blocks, tasks):
+            for i, j, _ in matches:
+                groups.union(i, j)
+    else:
+        pool = multiprocessing.get_context('spawn').Pool(workers, initializer=_init_worker,
+                                                         initargs=(entities, threshold))
+        with pool:
+            for matches in pool.imap_unordered(_score_blocks, tasks):
+                for i, j, _ in matches:
+                    groups.union(i, j)
+
+    members: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(entities)):
+        members[groups.find(i)].append(i)
+    return [group for group in members.values() if len(group) > 1]
+
+
+def load_entities(file_path: str) -> list[Entity]:
+    return [make_entity(section, record)
+            for section, record in iter_iif_records(file_path, sections=NAME_SECTIONS, fields=NAME_FIELDS)]
+
+
+def write_groups(entities: list[Entity], groups: list[list[int]], output_file: str):
+    with open_text(output_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Group', 'Section', 'RefNum', 'Name', 'Company', 'Email', 'Phone'])
+        for number, group in enumerate(groups, start=1):
+            writer.writerows([number, entities[i].section.value, entities[i].refnum, entities[i].name,
+                              entities[i].company, entities[i].email, entities[i].phone] for i in group)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Find duplicate customers, vendors and other names')
+    parser.add_argument('input_file', help='Input IIF file path')
+    parser.add_argument('--output', required=True, help='Write the merge groups to a CSV file', metavar='FILE')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Minimum match score between 0 and 1')
+    parser.add_argument('--workers', type=int, help='Number of scoring processes (default: all cores)')
+
+    args = parser.parse_args()
+    entities = load_entities(args.input_file)
+    groups = find_duplicates(entities, args.threshold, args.workers)
+    write_groups(entities, groups, args.output)
+
+    print(f"{len(entities)} names")
+    print(f"{len(groups)} groups")
+    print(f"{sum(map(len, groups))} names in groups")
@@ -0,0 +1,332 @@
+import csv
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Optional, TextIO
+
+from iif_data_types import RowType
+from iif_schema import IifWriter
+from iif_io import WRITE_BUFFER_SIZE, compression_for, open_text
+from field_mapping import CompiledSpec, MappingSpec, compile_spec
+
+DEFAULT_BATCH_SIZE = 2000
+DEFAULT_QUEUE_DEPTH = 8
+DEFAULT_CHECKPOINT_INTERVAL = 60.0  # seconds
+
+
+def output_resumable(path: str) -> bool:
+    """Whether an output file can be cut back to a saved position, which compressed files can't."""
+    return compression_for(path) is None
+
+
+def open_output(path: str, encoding: str, state: Optional[dict] = None) -> TextIO:
+    """Opens a sink's output file, or with a state() reopens it there, dropping anything written after it."""
+    if state is None:
+        return open_text(path, 'w', encoding=encoding, newline='')
+    f = open(path, 'r+', encoding=encoding, newline='', buffering=WRITE_BUFFER_SIZE)
+    f.seek(state['position'])
+    f.truncate()
+    return f
+
+
+def output_position(f: TextIO) -> int:
+    """Flushes an output file to disk and returns the position to resume it from."""
+    f.flush()
+    os.fsync(f.fileno())
+    return f.tell()
+
+
+class Sink:
+    """An export target fed by ExportPipeline.
+
+    open(), write_batch() and close() are all called on the sink's own writer
+    thread, so a sink may hold resources that are bound to that thread.
+
+    `fields` names the record fields the sink reads, so the parser can skip
+    decoding the others; None means the sink may read any field.  A sink with
+    `unknown_sections` also takes the GenericRecords of the sections a robust
+    parse kept, which are keyed by their section name instead of a RowType.
+
+    `failed` is set before close() when the export didn't complete, because
+    the sink or the record stream raised, so the sink can discard its output
+    instead of finishing it.
+
+    A `resumable` sink can report its state() between batches.  Given that
+    state as `resume_state` before it is opened, it continues its output from
+    there instead of starting over, dropping anything written after it.
+    """
+    row_types: frozenset = frozenset()
+    fields: Optional[frozenset[str]] = None
+    unknown_sections: bool = False
+    resumable: bool = False
+    resume_state: Optional[dict] = None
+    failed: bool = False
+
+    def open(self):
+        pass
+
+    def write_batch(self, records: list):
+        raise NotImplementedError
+
+    def state(self) -> dict:
+        """Makes everything written so far durable and returns a JSON-serializable resume_state."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class TextSink(Sink):
+    """Writes one rendered string per record to a buffered, optionally compressed text file."""
+
+    def __init__(self, output_file: str, row_types: Iterable[RowType], render: Callable[[object], str],
+                 encoding: str = 'utf-8', header: str = '', fields: Optional[Iterable[str]] = None):
+        self.output_file = output_file
+        self.row_types = frozenset(row_types)
+        self.render = render
+        self.fields = frozenset(fields) if fields is not None else None
+        self.encoding = encoding
+        self.header = header
+        self.resumable = output_resumable(output_file)
+        self.file = None
+
+    def open(self):
+        self.file = open_output(self.output_file, self.encoding, self.resume_state)
+        if self.header and self.resume_state is None:
+            self.file.write(self.header)
+
+    def write_batch(self, records: list):
+        self.file.write(''.join(map(self.render, records)))
+
+    def state(self) -> dict:
+        return {'position': output_position(self.file)}
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+class IifSink(Sink):
+    """Writes every record back out as IIF in stream order.
+
+    Without `row_types`, the sections kept by a robust parse are written too,
+    under their original headers.
+    """
+
+    def __init__(self, output_file: str, row_types: Optional[Iterable[RowType]] = None, fidelity: bool = False):
+        self.output_file = output_file
+        self.row_types = frozenset(row_types if row_types is not None else RowType)
+        self.unknown_sections = row_types is None
+        self.fidelity = fidelity
+        self.resumable = output_resumable(output_file)
+        self.file = None
+
+    def open(self):
+        self.file = open_output(self.output_file, 'utf-8-sig', self.resume_state)
+        self.writer = IifWriter(self.file, self.fidelity)
+        if self.resume_state is not None:
+            # Continue the section being written without repeating its header
+            self.writer.header = self.resume_state['header']
+
+    def write_batch(self, records: list):
+        self.writer.write_records(records)
+
+    def state(self) -> dict:
+        return {'position': output_position(self.file), 'header': self.writer.header}
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+class CsvSink(Sink):
+    """Writes the records of one row type through a compiled mapping spec."""
+
+    def __init__(self, output_file: str, row_type: RowType, spec: MappingSpec | CompiledSpec):
+        self.output_file = output_file
+        self.row_types = frozenset([row_type])
+        self.spec = spec if isinstance(spec, CompiledSpec) else compile_spec(spec)
+        self.fields = self.spec.fields
+        self.resumable = output_resumable(output_file)
+        self.file = None
+
+    def open(self):
+        self.file = open_output(self.output_file, 'utf-8', self.resume_state)
+        self.writer = csv.writer(self.file)
+        if self.resume_state is None:
+            self.writer.writerow(self.spec.columns)
+            self.next_row = 1
+        else:
+            self.next_row = self.resume_state['row']
+
+    def write_batch(self, records: list):
+        start = self.next_row
+        self.next_row += len(records)
+        self.writer.writerows(map(self.spec.project, range(start, self.next_row), records))
+
+    def state(self) -> dict:
+        return {'position': output_position(self.file), 'row': self.next_row}
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+class _StateRequest:
+    """Queued behind a sink's pending batches to collect its state() once they are written."""
+
+    def __init__(self):
+        self.state: Optional[dict] = None
+        self.done = threading.Event()
+
+
+class _SinkWorker(threading.Thread):
+    def __init__(self, sink: Sink, queue_depth: int):
+        super().__init__(daemon=True)
+        self.sink = sink
+        self.queue: queue.Queue[Optional[list]] = queue.Queue(maxsize=queue_depth)
+        self.pending: list = []
+        self.error: Optional[BaseException] = None
+
+    def run(self):
+        try:
+            self.sink.open()
+            while (batch := self.queue.get()) is not None:
+                if type(batch) is _StateRequest:
+                    try:
+                        batch.state = self.sink.state()
+                    finally:
+                        batch.done.set()
+                else:
+                    self.sink.write_batch(batch)
+        except BaseException as e:
+            self.error = e
+            self.sink.failed = True
+            # Keep draining so the dispatcher never blocks on a dead sink
+            while (batch := self.queue.get()) is not None:
+                if type(batch) is _StateRequest:
+                    batch.done.set()
+        finally:
+            try:
+                self.sink.close()
+            except BaseException as e:
+                self.error = self.error or e
+
+
+class ExportPipeline:
+    """Dispatches a record stream to every registered sink in a single pass.
+
+    Each sink runs on its own thread behind a bounded queue, so all output
+    files are written concurrently while the stream is being read.
+    """
+
+    def __init__(self, sinks: Iterable[Sink] = (), batch_size: int = DEFAULT_BATCH_SIZE,
+                 queue_depth: int = DEFAULT_QUEUE_DEPTH):
+        self.sinks: list[Sink] = list(sinks)
+        self.batch_size = batch_size
+        self.queue_depth = queue_depth
+
+    def add_sink(self, sink: Sink):
+        self.sinks.append(sink)
+
+    def sections(self) -> frozenset[RowType]:
+        """The row types read by at least one sink."""
+        return frozenset().union(*(sink.row_types for sink in self.sinks))
+
+    def fields(self) -> dict[RowType, Optional[frozenset[str]]]:
+        """The fields the sinks read per row type, or None where every field is needed."""
+        needed: dict[RowType, Optional[frozenset[str]]] = {}
+        for sink in self.sinks:
+            for row_type in sink.row_types:
+                if row_type in needed and needed[row_type] is None:
+                    continue
+                if sink.fields is None:
+                    needed[row_type] = None
+                else:
+                    needed[row_type] = needed.get(row_type, frozenset()) | sink.fields
+        return needed
+
+    def resumable(self) -> bool:
+        """Whether every sink can report a state() to resume from."""
+        return all(sink.resumable for sink in self.sinks)
+
+    def run(self, records: Iterable[tuple[RowType | str, object]],
+            checkpoint: Optional[Callable[[list[dict], dict[RowType | str, int]], None]] = None,
+            checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL) -> dict[RowType | str, int]:
+        """Feeds every record to the sinks subscribed to its row type and returns per-type counts.
+
+        With `checkpoint`, about every `checkpoint_interval` seconds the sinks
+        write out every record dispatched so far and checkpoint(states, counts)
+        is called with their state(), in sink order, while `records` is paused
+        right after the last of those records.  Every sink must be resumable.
+        """
+        if checkpoint is not None and not self.resumable():
+            raise ValueError("Checkpoints need every sink to be resumable")
+        workers = [_SinkWorker(sink, self.queue_depth) for sink in self.sinks]
+        routes: dict[RowType | str, list[_SinkWorker]] = {row_type: [] for row_type in RowType}
+        for worker in workers:
+            for row_type in worker.sink.row_types:
+                routes[row_type].append(worker)
+            worker.start()
+
+        counts = {row_type: 0 for row_type in RowType}
+        batch_size = self.batch_size
+        seen = 0
+        next_checkpoint = time.monotonic() + checkpoint_interval
+        try:
+            for row_type, record in records:
+                targets = routes.get(row_type)
+                if targets is None:
+                    # A section kept from a robust parse
+                    targets = routes[row_type] = [worker for worker in workers if worker.sink.unknown_sections]
+                    counts[row_type] = 0
+                counts[row_type] += 1
+                for worker in targets:
+                    pending = worker.pending
+                    pending.append(record)
+                    if len(pending) >= batch_size:
+                        worker.queue.put(pending)
+                        worker.pending = []
+                if checkpoint is not None:
+                    seen += 1
+                    # Look at the clock once per batch worth of records
+                    if seen % batch_size == 0 and time.monotonic() >= next_checkpoint:
+                        states = self._collect_states(workers)
+                        if states is not None:
+                            checkpoint(states, counts)
+                        next_checkpoint = time.monotonic() + checkpoint_interval
+        except BaseException:
+            for worker in workers:
+                worker.sink.failed = True
+            raise
+        finally:
+            for worker in workers:
+                if worker.pending:
+                    worker.queue.put(worker.pending)
+                    worker.pending = []
+                worker.queue.put(None)
+            for worker in workers:
+                worker.join()
+
+        for worker in workers:
+            if worker.error:
+                raise worker.error
+        return counts
+
+    @staticmethod
+    def _collect_states(workers: list[_SinkWorker]) -> Optional[list[dict]]:
+        """Waits for every sink to write its pending records and returns their states, None if one failed."""
+        requests = []
+        for worker in workers:
+            if worker.pending:
+                worker.queue.put(worker.pending)
+                worker.pending = []
+            request = _StateRequest()
+            worker.queue.put(request)
+            requests.append(request)
+        for request in requests:
+            request.done.wait()
+        if any(worker.error for worker in workers):
+            return None
+        return [request.state for request in requests]
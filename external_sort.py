@@ -0,0 +1,145 @@
+import heapq
+import os
+import pickle
+import sys
+import tempfile
+import multiprocessing
+from typing import Callable, Hashable, Iterable, Iterator, Optional
+
+from iif_data_types import *
+from iif_wire import record_packer, record_unpacker, GENERIC_SCHEMA
+
+DEFAULT_MEMORY_MB = 256
+MERGE_CHUNK_ROWS = 4096  # rows per pickle in a run file, read back one chunk at a time
+
+
+def name_key(record) -> tuple:
+    """Sorts by NAME split on ':', so every account comes right before its sub-accounts."""
+    name = getattr(record, 'NAME', None) or getattr(record, 'ACCNT', None) or ''
+    return tuple(name.casefold().split(':'))
+
+
+def refnum_key(record) -> tuple:
+    refnum = getattr(record, 'REFNUM', None)
+    return (refnum is None, refnum or 0)
+
+
+SORT_KEYS: dict[str, Callable[[object], Hashable]] = {
+    'NAME': name_key,
+    'REFNUM': refnum_key,
+}
+
+# The fields each sort key reads, which a projected parse must still decode
+SORT_KEY_FIELDS = {
+    'NAME': frozenset({'NAME', 'ACCNT'}),
+    'REFNUM': frozenset({'REFNUM'}),
+}
+
+
+def _row_bytes(row) -> int:
+    return sys.getsizeof(row) + sum(map(sys.getsizeof, row))
+
+
+def _write_run(path: str, entries: list) -> str:
+    entries.sort()
+    with open(path, 'wb') as f:
+        for start in range(0, len(entries), MERGE_CHUNK_ROWS):
+            pickle.dump(entries[start:start + MERGE_CHUNK_ROWS], f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path: str) -> Iterator[tuple]:
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def sorted_records(records: Iterable[tuple[RowType | str, object]], key: str | Callable = 'NAME',
+                   memory_mb: int = DEFAULT_MEMORY_MB, workers: int = 1,
+                   tmpdir: Optional[str] = None) -> Iterator[tuple[RowType | str, object]]:
+    """Sorts a record stream within each section, keeping sections in stream order.
+
+    Records are buffered as packed tuples (see iif_wire) until `memory_mb` is
+    used, then sorted and spilled to a temporary run file; the runs are
+    k-way merged at the end.  With workers > 1, runs are sorted and written on
+    a process pool while the stream is still being read.  The pool's workers
+    are spawned rather than forked, since the parser and sink threads may be
+    running and holding locks a forked child would inherit.  The sort is stable.
+
+    Records come back as plain records: lazy records are decoded in full and
+    fidelity records lose their source line.
+    """
+    key_func = SORT_KEYS[key] if isinstance(key, str) else key
+    # Runs held by the pool count against the budget too
+    budget = memory_mb * (1 << 20) // (workers + 1 if workers > 1 else 1)
+
+    section_index: dict[RowType | str, int] = {}
+    sections: list[RowType | str] = []
+    packers: dict[type, Callable] = {}
+    schemas: dict[int, tuple] = {}
+    row_sizes: dict[int, int] = {}
+
+    entries: list[tuple] = []
+    used = 0
+    seq = 0
+    with tempfile.TemporaryDirectory(prefix='iif-sort-', dir=tmpdir) as workdir:
+        pool = None
+        pending = []
+        runs: list[str] = []
+        try:
+            for section, record in records:
+                index = section_index.get(section)
+                if index is None:
+                    index = section_index[section] = len(sections)
+                    sections.append(section)
+                record_class = type(record)
+                pack = packers.get(record_class)
+                if pack is None:
+                    if record_class is GenericRecord:
+                        schema, pack = GENERIC_SCHEMA, lambda r: (r.headers, r.values)
+                    else:
+                        schema, pack = record_packer(record_class)
+                    packers[record_class] = pack
+                    schemas.setdefault(index, schema)
+                row = pack(record)
+                entries.append((index, key_func(record), seq, row))
+                seq += 1
+                size = row_sizes.get(index)
+                if size is None:
+                    # Estimated once per section from its first record, plus the entry and its key
+                    size = row_sizes[index] = _row_bytes(row) + 200
+                used += size
+
+                if used >= budget:
+                    path = os.path.join(workdir, f'run{len(runs) + len(pending):05d}')
+                    if workers > 1:
+                        pool = pool or multiprocessing.get_context('spawn').Pool(workers)
+                        if len(pending) >= workers:
+                            runs.append(pending.pop(0).get())
+                        pending.append(pool.apply_async(_write_run, (path, entries)))
+                    else:
+                        runs.append(_write_run(path, entries))
+                    entries, used = [], 0
+            if pool:
+                runs.extend(result.get() for result in pending)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        unpackers = []
+        for index, section in enumerate(sections):
+            schema = schemas[index]
+            if schema == GENERIC_SCHEMA:
+                unpackers.append(lambda row: GenericRecord(*row))
+            else:
+                unpackers.append(record_unpacker(get_class_by_row_type(section), schema))
+
+        entries.sort()
+        merged = heapq.merge(*map(_read_run, runs), entries) if runs else entries
+        for index, _, _, row in merged:
+            yield sections[index], unpackers[index](row)
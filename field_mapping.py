@@ -0,0 +1,101 @@
+import csv
+import json
+import keyword
+from itertools import count, islice
+from typing import Any, Callable, Iterable, NamedTuple, Optional, Union
+
+from iif_io import open_text
+from iif_schema import compile_function, record_fields
+
+# A mapping spec is a sequence of (column, source) pairs.  The source is one of:
+#   - a record field name, written as `record.FIELD or ''`
+#   - None, for a column that is always empty
+#   - ROW_NUMBER, for a 1-based running row number
+#   - a callable taking the record and returning the cell value
+ROW_NUMBER = '#'
+
+Source = Union[str, None, Callable[[Any], Any]]
+MappingSpec = Iterable[tuple[str, Source]]
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+class CompiledSpec(NamedTuple):
+    columns: tuple[str, ...]
+    project: Callable[[int, Any], tuple]
+    # The record fields the spec reads, or None if a callable source may read any field
+    fields: Optional[frozenset[str]]
+
+
+def compile_spec(spec: MappingSpec) -> CompiledSpec:
+    """Compiles a mapping spec into a function returning one row tuple per record."""
+    columns = []
+    fields: Optional[set[str]] = set()
+    items = []
+    namespace: dict[str, Any] = {}
+    for column, source in spec:
+        columns.append(column)
+        if source is None:
+            items.append("''")
+        elif source == ROW_NUMBER:
+            items.append('idx')
+        elif callable(source):
+            name = f'_f{len(namespace)}'
+            namespace[name] = source
+            items.append(f'{name}(r)')
+            fields = None
+        elif isinstance(source, str) and source.isidentifier() and not keyword.iskeyword(source):
+            if fields is not None:
+                fields.add(source)
+            items.append(f"r.{source} or ''")
+        else:
+            raise ValueError(f"Invalid source for column '{column}': {source!r}")
+
+    code = f"def project(idx, r):\n    return ({', '.join(items)}{',' if len(items) == 1 else ''})\n"
+    return CompiledSpec(tuple(columns), compile_function(code, 'project', namespace),
+                        frozenset(fields) if fields is not None else None)
+
+
+def select_columns(spec: MappingSpec, columns: Iterable[str]) -> list[tuple[str, Source]]:
+    """Narrows a mapping spec to the named columns, in the order they are named."""
+    sources = dict(spec)
+    missing = [column for column in columns if column not in sources]
+    if missing:
+        raise ValueError(f"Unknown columns: {', '.join(missing)}")
+    return [(column, sources[column]) for column in columns]
+
+
+def check_sources(spec: MappingSpec, record_class) -> None:
+    """Raises ValueError naming every field source that isn't a field of `record_class`."""
+    names = {field.name for field in record_fields(record_class)}
+    unknown = [f"'{column}': {source!r}" for column, source in spec
+               if isinstance(source, str) and source != ROW_NUMBER and source not in names]
+    if unknown:
+        raise ValueError(f"Unknown {record_class.__name__} fields in the mapping spec: {', '.join(unknown)}")
+
+
+def load_spec(path: str, record_class=None) -> list[tuple[str, Optional[str]]]:
+    """Loads a user mapping spec from a JSON list of [column, field] pairs.
+
+    With a `record_class`, every field is checked to exist on it, so a typo
+    fails here instead of partway through an export.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        pairs = json.load(f)
+    if not isinstance(pairs, list) or not all(isinstance(pair, list) and len(pair) == 2 for pair in pairs):
+        raise ValueError(f"'{path}' must hold a JSON list of [column, field] pairs")
+    spec = [(column, source) for column, source in pairs]
+    if record_class is not None:
+        check_sources(spec, record_class)
+    return spec
+
+
+def write_csv(records: Iterable, output_file: str, spec: Union[MappingSpec, CompiledSpec],
+              batch_size: int = DEFAULT_BATCH_SIZE):
+    compiled = spec if isinstance(spec, CompiledSpec) else compile_spec(spec)
+    with open_text(output_file, 'w', encoding='utf-8', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(compiled.columns)
+        rows = map(compiled.project, count(1), records)
+        while batch := list(islice(rows, batch_size)):
+            writer.writerows(batch)
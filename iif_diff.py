@@ -0,0 +1,136 @@
+import csv
+import hashlib
+from dataclasses import dataclass, field
+from typing import Hashable, Optional
+
+from iif_data_types import *
+from convert import iter_iif_records
+from iif_io import open_text
+
+FINGERPRINT_SIZE = 8
+DUPLICATE = b''  # the fingerprint kept for a key found on several records of the old file
+
+
+def record_key(record) -> Optional[Hashable]:
+    """Identifies a list entry across exports by its REFNUM, falling back to its name."""
+    refnum = getattr(record, 'REFNUM', None)
+    if refnum is not None:
+        return refnum
+    if isinstance(record, Budget):
+        return (record.ACCNT, record.PERIOD, record.STARTDATE, record.CLASS, record.CUSTOMER)
+    return getattr(record, 'NAME', None) or getattr(record, 'CODE', None) or None
+
+
+def record_fingerprint(record) -> bytes:
+    return hashlib.blake2b(record.to_iif_row().encode('utf-8'), digest_size=FINGERPRINT_SIZE).digest()
+
+
+@dataclass
+class DiffReport:
+    added: dict[RowType, int] = field(default_factory=lambda: {row_type: 0 for row_type in RowType})
+    modified: dict[RowType, int] = field(default_factory=lambda: {row_type: 0 for row_type in RowType})
+    removed: dict[RowType, list] = field(default_factory=lambda: {row_type: [] for row_type in RowType})
+    # Keys found on more than one record of a file, whose records can't be paired up
+    duplicates: dict[RowType, list] = field(default_factory=lambda: {row_type: [] for row_type in RowType})
+    # Records of the new file with nothing to identify them by, e.g. HDR
+    unkeyed: dict[RowType, int] = field(default_factory=lambda: {row_type: 0 for row_type in RowType})
+
+    def add_duplicate(self, row_type: RowType, key):
+        if key not in self.duplicates[row_type]:
+            self.duplicates[row_type].append(key)
+
+
+def diff_iif_files(old_file: str, new_file: str, delta_file: Optional[str] = None,
+                   changes_file: Optional[str] = None) -> DiffReport:
+    """Compares two IIF exports and optionally writes the added/modified records as an importable IIF.
+
+    Only the keys and fingerprints of the old file are held in memory; the new
+    file is streamed and each changed record is written out as it is seen.
+    Removed records are reported but can't be expressed in an IIF import.
+    A key found on several records of the old file, or again on a later record
+    of the new file, is reported as a duplicate rather than compared, and
+    records without a key are only counted.
+    """
+    report = DiffReport()
+    fingerprints: dict[RowType, dict] = {row_type: {} for row_type in RowType}
+    for row_type, record in iter_iif_records(old_file):
+        key = record_key(record)
+        if key is None:
+            continue
+        if key in fingerprints[row_type]:
+            report.add_duplicate(row_type, key)
+            fingerprints[row_type][key] = DUPLICATE
+        else:
+            fingerprints[row_type][key] = record_fingerprint(record)
+
+    seen: dict[RowType, set] = {row_type: set() for row_type in RowType}
+    delta = open_text(delta_file, 'w', encoding='utf-8-sig', newline='') if delta_file else None
+    changes = open_text(changes_file, 'w', encoding='utf-8', newline='') if changes_file else None
+    try:
+        changes_writer = csv.writer(changes) if changes else None
+        if changes_writer:
+            changes_writer.writerow(['Section', 'Change', 'Key'])
+        delta_section: Optional[RowType] = None
+
+        for row_type, record in iter_iif_records(new_file):
+            key = record_key(record)
+            if key is None:
+                report.unkeyed[row_type] += 1
+                continue
+            if key in seen[row_type]:
+                report.add_duplicate(row_type, key)
+                continue
+            seen[row_type].add(key)
+            previous = fingerprints[row_type].pop(key, None)
+            if previous == DUPLICATE:
+                continue
+            if previous is None:
+                report.added[row_type] += 1
+                change = 'added'
+            elif previous != record_fingerprint(record):
+                report.modified[row_type] += 1
+                change = 'modified'
+            else:
+                continue
+
+            if delta:
+                if row_type != delta_section:
+                    delta.write(get_class_by_row_type(row_type).to_iif_header() + '\n')
+                    delta_section = row_type
+                delta.write(record.to_iif_row() + '\n')
+            if changes_writer:
+                changes_writer.writerow([row_type.value, change, key])
+
+        for row_type, remaining in fingerprints.items():
+            report.removed[row_type] = [key for key, fingerprint in remaining.items() if fingerprint != DUPLICATE]
+            if changes_writer:
+                changes_writer.writerows([row_type.value, 'removed', key] for key in report.removed[row_type])
+                changes_writer.writerows([row_type.value, 'duplicate', key] for key in report.duplicates[row_type])
+    finally:
+        if delta:
+            delta.close()
+        if changes:
+            changes.close()
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compare two IIF list exports')
+    parser.add_argument('old_file', help='Previous IIF export')
+    parser.add_argument('new_file', help='Current IIF export')
+    parser.add_argument('--delta', help='Write added and modified records to an IIF file', metavar='FILE')
+    parser.add_argument('--changes', help='Write every change to a CSV file', metavar='FILE')
+
+    args = parser.parse_args()
+    report = diff_iif_files(args.old_file, args.new_file, args.delta, args.changes)
+
+    for row_type in RowType:
+        added, modified, removed = report.added[row_type], report.modified[row_type], len(report.removed[row_type])
+        duplicates, unkeyed = len(report.duplicates[row_type]), report.unkeyed[row_type]
+        if added or modified or removed or duplicates:
+            print(f"{row_type}: {added} added, {modified} modified, {removed} removed"
+                  + (f", {duplicates} duplicate keys not compared" if duplicates else ''))
+        if unkeyed:
+            print(f"{row_type}: {unkeyed} records without a key not compared")
@@ -0,0 +1,297 @@
+import codecs
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+try:
+    import zstandard
+except ImportError:  # .zst support is optional
+    zstandard = None
+
+READ_BUFFER_SIZE = 1 << 20
+WRITE_BUFFER_SIZE = 1 << 20
+GZIP_LEVEL = 6
+PREFETCH_BLOCK_SIZE = 1 << 20
+PREFETCH_QUEUE_DEPTH = 4
+SNIFF_BLOCK_SIZE = 64 << 10
+SNIFF_BLOCKS = 4
+
+COMPRESSION_SUFFIXES = {
+    '.gz': 'gzip',
+    '.xz': 'xz',
+    '.lzma': 'xz',
+    '.zst': 'zstd',
+}
+
+
+def compression_for(path: str) -> Optional[str]:
+    """Returns the codec implied by a file's extension, or None for a plain file."""
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1].lower())
+
+
+def open_binary(path: str, mode: str = 'rb') -> BinaryIO:
+    """Opens a file as a binary stream, compressing or decompressing by extension."""
+    codec = compression_for(path)
+    if codec is None:
+        return open(path, mode, buffering=0)
+    if codec == 'gzip':
+        return gzip.open(path, mode, compresslevel=GZIP_LEVEL)
+    if codec == 'xz':
+        return lzma.open(path, mode)
+    if zstandard is None:
+        raise RuntimeError(f"Reading or writing '{path}' requires the zstandard package")
+    return zstandard.open(path, mode)
+
+
+@dataclass
+class PrefetchStats:
+    """How a PrefetchReader's reader thread and its consumer overlapped."""
+    blocks: int = 0
+    bytes: int = 0
+    read_seconds: float = 0.0  # reader thread time spent reading and decompressing
+    reader_wait_seconds: float = 0.0  # reader blocked on a full queue: the consumer is the bottleneck
+    consumer_wait_seconds: float = 0.0  # consumer blocked on an empty queue: the reader is the bottleneck
+
+    def overlap(self) -> float:
+        """The fraction of the read time hidden behind the consumer's work."""
+        if not self.read_seconds:
+            return 1.0
+        return max(0.0, 1.0 - self.consumer_wait_seconds / self.read_seconds)
+
+    def summary(self) -> str:
+        return (f"{self.blocks} blocks, {self.bytes / 1e6:.1f} MB read in {self.read_seconds:.2f}s; "
+                f"reader waited {self.reader_wait_seconds:.2f}s, consumer waited {self.consumer_wait_seconds:.2f}s; "
+                f"{self.overlap():.0%} of reading overlapped")
+
+
+class PrefetchReader(io.RawIOBase):
+    """Reads a binary stream on a background thread, a block ahead of the consumer.
+
+    Blocks are handed over through a bounded queue, so decompression (or a slow
+    read) of the next blocks overlaps with parsing the current one.  Timings of
+    both sides are collected in `stats`.
+    """
+
+    def __init__(self, source: BinaryIO, block_size: int = PREFETCH_BLOCK_SIZE,
+                 queue_depth: int = PREFETCH_QUEUE_DEPTH, stats: Optional[PrefetchStats] = None):
+        super().__init__()
+        if block_size <= 0 or queue_depth <= 0:
+            raise ValueError("block_size and queue_depth must be positive")
+        self.source = source
+        self.block_size = block_size
+        self.stats = stats if stats is not None else PrefetchStats()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_depth)
+        self._stopped = threading.Event()
+        self._block = memoryview(b'')
+        self._eof = False
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        start = time.perf_counter()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        finally:
+            self.stats.reader_wait_seconds += time.perf_counter() - start
+
+    def _fill(self):
+        stats = self.stats
+        try:
+            while True:
+                start = time.perf_counter()
+                block = self.source.read(self.block_size)
+                stats.read_seconds += time.perf_counter() - start
+                if not block:
+                    break
+                stats.blocks += 1
+                stats.bytes += len(block)
+                if not self._put(block):
+                    return
+            self._put(None)
+        except BaseException as e:
+            self._put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._block:
+            if self._eof:
+                return 0
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                start = time.perf_counter()
+                item = self._queue.get()
+                self.stats.consumer_wait_seconds += time.perf_counter() - start
+            if item is None:
+                self._eof = True
+                return 0
+            if isinstance(item, BaseException):
+                self._eof = True
+                raise item
+            self._block = memoryview(item)
+        n = min(len(b), len(self._block))
+        b[:n] = self._block[:n]
+        self._block = self._block[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stopped.set()
+            self._thread.join()
+            self.source.close()
+        super().close()
+
+
+# Decoding error handler that reads a byte the codec can't decode as Windows-1252,
+# or as Latin-1 for the five bytes cp1252 leaves undefined
+DECODE_FALLBACK = 'iif-cp1252-fallback'
+
+
+def _decode_fallback(error: UnicodeError):
+    if not isinstance(error, UnicodeDecodeError):
+        raise error
+    raw = error.object[error.start:error.end]
+    return ''.join(bytes([b]).decode('cp1252', 'ignore') or chr(b) for b in raw), error.end
+
+
+codecs.register_error(DECODE_FALLBACK, _decode_fallback)
+
+
+def _is_utf8(block: bytes, partial_start: bool = False) -> bool:
+    if partial_start:
+        # A block sampled from the middle of the file may start inside a character
+        block = block.lstrip(bytes(range(0x80, 0xC0)))
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(block, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(path: str) -> str:
+    """Guesses the encoding of a text file from a few sampled blocks.
+
+    A BOM decides between utf-8-sig and utf-16; NUL bytes in every other
+    position mean BOM-less utf-16.  Otherwise the first block and, for an
+    uncompressed file, blocks spread through the rest of it are checked to be
+    valid utf-8, falling back to cp1252.
+    """
+    with open_binary(path) as f:
+        head = f.read(SNIFF_BLOCK_SIZE)
+        blocks = []
+        if compression_for(path) is None:
+            size = os.fstat(f.fileno()).st_size
+            # Spread over the rest of the file, the last block ending at its end
+            for i in range(1, SNIFF_BLOCKS):
+                offset = max(size * i // (SNIFF_BLOCKS - 1) - SNIFF_BLOCK_SIZE, 0)
+                if offset > len(head):
+                    f.seek(offset)
+                    blocks.append(f.read(SNIFF_BLOCK_SIZE))
+
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    if len(head) >= 2:
+        if head[1::2].count(0) > len(head) // 4:
+            return 'utf-16-le'
+        if head[0::2].count(0) > len(head) // 4:
+            return 'utf-16-be'
+    if _is_utf8(head) and all(_is_utf8(block, partial_start=True) for block in blocks):
+        return 'utf-8'
+    return 'cp1252'
+
+
+def open_text(path: str, mode: str = 'r', encoding: str = 'utf-8', newline: Optional[str] = None,
+              threaded: bool = False, block_size: int = PREFETCH_BLOCK_SIZE,
+              queue_depth: int = PREFETCH_QUEUE_DEPTH, stats: Optional[PrefetchStats] = None,
+              errors: Optional[str] = None):
+    """Opens a text file for reading ('r') or writing ('w') with large buffers.
+
+    Files ending in .gz, .xz/.lzma or .zst are transparently (de)compressed.
+    With threaded, reading and decompression run on a PrefetchReader thread
+    that stays up to `queue_depth` blocks of `block_size` bytes ahead.
+    """
+    if mode not in ('r', 'w'):
+        raise ValueError(f"mode must be 'r' or 'w', not {mode!r}")
+    if compression_for(path) is None and not threaded:
+        buffer_size = READ_BUFFER_SIZE if mode == 'r' else WRITE_BUFFER_SIZE
+        return open(path, mode, encoding=encoding, errors=errors, newline=newline, buffering=buffer_size)
+
+    binary = open_binary(path, mode + 'b')
+    if mode == 'r':
+        if threaded:
+            binary = PrefetchReader(binary, block_size, queue_depth, stats)
+        buffered = io.BufferedReader(binary, READ_BUFFER_SIZE)
+    else:
+        buffered = io.BufferedWriter(binary, WRITE_BUFFER_SIZE)
+    return io.TextIOWrapper(buffered, encoding=encoding, errors=errors, newline=newline)
+
+
+def byte_offsets_supported(encoding: str) -> bool:
+    """Whether LineReader can split a file in this encoding into lines and track their byte offsets."""
+    return not codecs.lookup(encoding).name.startswith('utf-16')
+
+
+class LineReader:
+    """Iterates the lines of a text file, keeping the exact byte offset after the last one.
+
+    Lines are read as bytes and decoded one at a time, so unlike a text file
+    object `offset` is exact at every line and a parse can later be restarted
+    there.  '\\r\\n' is returned as '\\n'.  For a compressed file the offset
+    counts decompressed bytes, and starting at one decompresses up to it.
+    Encodings that aren't ASCII-compatible (utf-16) can't be split this way.
+    """
+
+    def __init__(self, path: str, encoding: str = 'utf-8', errors: Optional[str] = None, offset: int = 0,
+                 threaded: bool = False, block_size: int = PREFETCH_BLOCK_SIZE,
+                 queue_depth: int = PREFETCH_QUEUE_DEPTH, stats: Optional[PrefetchStats] = None):
+        if not byte_offsets_supported(encoding):
+            raise ValueError(f"Can't track byte offsets in a {encoding} file")
+        self.encoding = encoding
+        self.errors = errors or 'strict'
+        self.offset = offset
+        # The size on disk, compressed or not
+        self.size = os.path.getsize(path)
+        binary = open_binary(path)
+        if offset:
+            binary.seek(offset)
+        if threaded:
+            binary = PrefetchReader(binary, block_size, queue_depth, stats)
+        self.file = io.BufferedReader(binary, READ_BUFFER_SIZE)
+
+    def __enter__(self) -> 'LineReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        encoding, errors = self.encoding, self.errors
+        for line in self.file:
+            self.offset += len(line)
+            if line.endswith(b'\r\n'):
+                line = line[:-2] + b'\n'
+            yield line.decode(encoding, errors)
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+from typing import Hashable, Optional, Sequence
+
+from iif_data_types import *
+from convert import iter_iif_records
+from iif_io import open_text
+from iif_spool import SectionSpool
+
+MERGE_KEYS = ('NAME', 'REFNUM')
+MERGE_POLICIES = ('newest', 'first', 'last')
+# What identifies the records of a section without a NAME when merging on NAME
+NAME_KEY_FIELDS = {
+    RowType.SALESTAXCODE: 'CODE',
+    RowType.TODO: 'REFNUM',
+}
+
+
+@dataclass
+class MergeReport:
+    kept: dict[RowType, int] = field(default_factory=lambda: {row_type: 0 for row_type in RowType})
+    dropped: dict[RowType, int] = field(default_factory=lambda: {row_type: 0 for row_type in RowType})
+
+
+def _merge_key(row_type: RowType, record, key: str) -> Optional[Hashable]:
+    if row_type is RowType.HDR:
+        return ''  # a single header for the consolidated file
+    if key == 'NAME':
+        key = NAME_KEY_FIELDS.get(row_type, key)
+    value = getattr(record, key, None)
+    # An empty key identifies nothing, so such records are all kept
+    return None if value == '' else value
+
+
+def merge_iif_files(input_files: Sequence[str], output_file: str, key: str = 'NAME', policy: str = 'newest',
+                    tmpdir: Optional[str] = None) -> MergeReport:
+    """Consolidates several IIF exports into one, keeping one record per RowType and key.
+
+    The first pass streams every input decoding only the key and TIMESTAMP,
+    and remembers which occurrence of each key wins under `policy`: the
+    newest TIMESTAMP (ties go to the earlier file), the first or the last
+    one.  The second pass streams the inputs again and spools the winners
+    per section, so the output is grouped by RowType and memory only grows
+    with the number of distinct keys.  Sales tax codes are merged on their
+    CODE and to-dos on their REFNUM when the key is NAME.  Records without
+    the key field, such as budgets, or with an empty one are all kept.  Kept
+    records are copied verbatim.
+    """
+    if key not in MERGE_KEYS:
+        raise ValueError(f"key must be one of {', '.join(MERGE_KEYS)}, not {key!r}")
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"policy must be one of {', '.join(MERGE_POLICIES)}, not {policy!r}")
+    fields = {key, 'TIMESTAMP', *(NAME_KEY_FIELDS.values() if key == 'NAME' else ())}
+
+    # (row type, key) -> (timestamp, file index, record index) of the winning record
+    winners: dict[tuple[RowType, Hashable], tuple] = {}
+    for file_index, input_file in enumerate(input_files):
+        for record_index, (row_type, record) in enumerate(iter_iif_records(input_file, fields=fields)):
+            record_key = _merge_key(row_type, record, key)
+            if record_key is None:
+                continue
+            timestamp = getattr(record, 'TIMESTAMP', None) or 0
+            current = winners.get((row_type, record_key))
+            if (current is None or policy == 'last'
+                    or (policy == 'newest' and timestamp > current[0])):
+                winners[(row_type, record_key)] = (timestamp, file_index, record_index)
+
+    report = MergeReport()
+    with SectionSpool(tmpdir) as spool:
+        for file_index, input_file in enumerate(input_files):
+            records = iter_iif_records(input_file, fields=fields, fidelity=True)
+            for record_index, (row_type, record) in enumerate(records):
+                record_key = _merge_key(row_type, record, key)
+                if record_key is not None and winners[(row_type, record_key)][1:] != (file_index, record_index):
+                    report.dropped[row_type] += 1
+                    continue
+                report.kept[row_type] += 1
+                spool.add(row_type, record)
+
+        with open_text(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+            spool.write_to(f)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Merge IIF list exports into one, removing duplicates')
+    parser.add_argument('output_file', help='Consolidated IIF file')
+    parser.add_argument('input_files', nargs='+', help='IIF files to merge, in priority order')
+    parser.add_argument('--key', choices=MERGE_KEYS, default='NAME', help='Field identifying duplicate records')
+    parser.add_argument('--policy', choices=MERGE_POLICIES, default='newest',
+                        help='Which duplicate to keep: newest TIMESTAMP, first or last seen')
+    parser.add_argument('--tmpdir', help='Directory for the temporary section files')
+
+    args = parser.parse_args()
+    report = merge_iif_files(args.input_files, args.output_file, args.key, args.policy, args.tmpdir)
+
+    for row_type in RowType:
+        kept, dropped = report.kept[row_type], report.dropped[row_type]
+        if kept or dropped:
+            print(f"{row_type}: {kept} kept, {dropped} duplicates dropped")
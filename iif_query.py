@@ -0,0 +1,266 @@
+import re
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from iif_data_types import *
+from iif_schema import (FieldSpec, codegen_namespace, compile_function, record_builder_source, record_fields,
+                        try_parse_float, try_parse_int)
+from sqlite_export import TABLE_SPECS, quote_identifier
+
+OPERATORS = ('!=', '<=', '>=', '=', '<', '>', '~')
+ALTERNATIVE_SEPARATOR = '|'  # NAME=A|B matches either value
+
+_COMPARISON = re.compile(r'^\s*(?:(\w+)\.)?(\w+)\s*(!=|<=|>=|=|<|>|~)\s*(.*?)\s*$')
+_PRESENCE = re.compile(r'^\s*(!?)\s*(?:(\w+)\.)?(\w+)\s*$')
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """One condition on a record field, e.g. VEND.EMAIL, ACCNTTYPE=EXP or LIMIT>=5000.
+
+    `field` is an attribute or IIF column name.  Without an `op` the field
+    must be non-empty, with op '!' empty.  '=' and '!=' take alternatives
+    separated by '|', '~' is a case-insensitive substring match, and the
+    orderings compare numbers for number fields, and for text fields such as
+    LIMIT when the value is a number (then text that isn't one never
+    matches).  A predicate with a `section` only applies to that section.
+    """
+    section: Optional[RowType]
+    field: str
+    op: Optional[str] = None
+    value: str = ''
+
+    def __str__(self) -> str:
+        prefix = f'{self.section.value}.' if self.section else ''
+        if self.op is None or self.op == '!':
+            return f"{self.op or ''}{prefix}{self.field}"
+        return f'{prefix}{self.field}{self.op}{self.value}'
+
+
+def parse_predicate(text: str) -> Predicate:
+    """Parses '[SECTION.]FIELD', '![SECTION.]FIELD' or '[SECTION.]FIELD<op>VALUE'.
+
+    Spaces around the operator and the value are ignored, so 'ACCNTTYPE = EXP'
+    is ACCNTTYPE=EXP.
+    """
+    match = _COMPARISON.match(text)
+    if match:
+        section, field, op, value = match.groups()
+    elif match := _PRESENCE.match(text):
+        negate, section, field = match.groups()
+        op, value = negate or None, ''
+    else:
+        raise ValueError(f"Invalid predicate {text!r}, expected [SECTION.]FIELD<op>VALUE with op one of "
+                         f"{' '.join(OPERATORS)}")
+    if section is not None:
+        if section not in RowType.__members__:
+            raise ValueError(f"Unknown section {section!r} in predicate {text!r}")
+        section = RowType[section]
+    return Predicate(section, field, op, value)
+
+
+def _field_spec(record_class, name: str) -> Optional[FieldSpec]:
+    for spec in record_fields(record_class):
+        if spec.name == name or name in spec.columns:
+            return spec
+    return None
+
+
+_ORDERINGS = ('<', '<=', '>', '>=')
+_PARSERS = {'_int': try_parse_int, '_float': try_parse_float}
+
+
+def never(values: list) -> bool:
+    """The matcher of a layout no line of which can match."""
+    return False
+
+
+class Query:
+    """A conjunction of predicates, checked on the split columns of a data line before it is decoded.
+
+    A record matches when every predicate applies to its section and holds,
+    so ACCNTTYPE=EXP only keeps accounts and VEND.EMAIL only vendors.  The
+    parser skips the other sections without splitting their lines, and for
+    the rest calls matcher() once per section layout for a compiled check
+    that indexes the raw values directly.
+    """
+
+    def __init__(self, predicates: Iterable[Predicate | str] = ()):
+        self.predicates: list[Predicate] = [p if isinstance(p, Predicate) else parse_predicate(p) for p in predicates]
+        self._specs: dict[RowType, list[FieldSpec]] = {}
+        self._matchers: dict[tuple, Optional[Callable[[list], bool]]] = {}
+        for predicate in self.predicates:
+            applies = False
+            for row_type in [predicate.section] if predicate.section else RowType:
+                spec = _field_spec(get_class_by_row_type(row_type), predicate.field)
+                if spec is None:
+                    continue
+                if spec.repeat:
+                    raise ValueError(f"Can't filter on the repeated field {spec.name}")
+                if predicate.op in _ORDERINGS or predicate.op in ('=', '!='):
+                    for value in self._values(spec, predicate):
+                        if value is None:
+                            raise ValueError(f"{predicate.value!r} is not a number, in predicate '{predicate}'")
+                applies = True
+            if not applies:
+                where = f'section {predicate.section.value}' if predicate.section else 'any section'
+                raise ValueError(f"No field {predicate.field} in {where}, in predicate '{predicate}'")
+        for row_type in self.sections():
+            record_class = get_class_by_row_type(row_type)
+            self._specs[row_type] = [_field_spec(record_class, predicate.field) for predicate in self.predicates]
+
+    def __bool__(self) -> bool:
+        return bool(self.predicates)
+
+    @staticmethod
+    def _values(spec: FieldSpec, predicate: Predicate) -> list:
+        """The predicate's values as the field decodes them."""
+        if predicate.op in ('=', '!='):
+            values = [value.strip() for value in predicate.value.split(ALTERNATIVE_SEPARATOR)]
+        else:
+            values = [predicate.value]
+        if spec.parser:
+            return [_PARSERS[spec.parser](value) for value in values]
+        return values
+
+    @staticmethod
+    def _numeric_text(spec: FieldSpec, predicate: Predicate) -> bool:
+        """Whether an ordering on a text field compares numbers, because its value is one."""
+        return spec.parser is None and predicate.op in _ORDERINGS and try_parse_float(predicate.value) is not None
+
+    def sections(self) -> frozenset[RowType]:
+        """The sections every predicate applies to, the only ones that can match."""
+        sections = frozenset(RowType)
+        for predicate in self.predicates:
+            sections &= {row_type for row_type in ([predicate.section] if predicate.section else RowType)
+                         if _field_spec(get_class_by_row_type(row_type), predicate.field) is not None}
+        return sections
+
+    def matcher(self, row_type: RowType, headers: Sequence[str]) -> Optional[Callable[[list], bool]]:
+        """The compiled check for a section layout, taking the split values of a data line.
+
+        Returns None when every line matches and `never` when none can, e.g.
+        because a required column is missing from the layout.
+        """
+        key = (row_type, tuple(headers))
+        if key in self._matchers:
+            return self._matchers[key]
+        if row_type not in self._specs:
+            match = never
+        elif not self.predicates:
+            match = None
+        else:
+            match = self._compile_matcher(row_type, headers)
+        self._matchers[key] = match
+        return match
+
+    def _compile_matcher(self, row_type: RowType, headers: Sequence[str]) -> Callable[[list], bool]:
+        positions = {}
+        for i, column in enumerate(headers):
+            positions.setdefault(column, i)
+
+        constants = {}
+        lines = []
+        constant = True
+        for n, (predicate, spec) in enumerate(zip(self.predicates, self._specs[row_type])):
+            i = positions.get(spec.columns[0])
+            if i is None or i == 0:
+                raw = "''"  # a missing column decodes as empty
+            else:
+                raw = f'v[{i}]'
+                constant = False
+            value = spec.parse_expr(raw)
+            op = predicate.op
+            if op is None or op == '!':
+                test = f'{value} is not None' if spec.parser else raw
+                lines.append(f'if {"" if op else "not "}{test}: return False')
+            elif op in ('=', '!='):
+                values = self._values(spec, predicate)
+                constants[f'_c{n}'] = values[0] if len(values) == 1 else frozenset(values)
+                test = f"{value} {'==' if len(values) == 1 else 'in'} _c{n}"
+                lines.append(f'if {"not " if op == "=" else ""}({test}): return False')
+            elif op == '~':
+                constants[f'_c{n}'] = predicate.value.casefold()
+                lines.append(f'if _c{n} not in {raw}.casefold(): return False')
+            elif self._numeric_text(spec, predicate):
+                constants[f'_c{n}'] = try_parse_float(predicate.value)
+                lines.append(f'x = _float({raw})')
+                lines.append(f'if x is None or not x {op} _c{n}: return False')
+            else:
+                constants[f'_c{n}'] = self._values(spec, predicate)[0]
+                lines.append(f'x = {value}')
+                lines.append(f'if x is None or not x {op} _c{n}: return False')
+        body = ''.join(f'    {line}\n' for line in lines)
+        match = compile_function(f'def match(v):\n{body}    return True\n', 'match',
+                                 codegen_namespace(get_class_by_row_type(row_type), **constants))
+        if constant:
+            # Every column the predicates read is missing from this layout
+            return None if match([]) else never
+        return match
+
+    def sql(self, row_type: RowType) -> tuple[str, list]:
+        """A WHERE clause and its parameters selecting the matching rows of a SqliteSink table."""
+        clauses, params = [], []
+        for predicate, spec in zip(self.predicates, self._specs[row_type]):
+            column = quote_identifier(spec.columns[0])
+            op = predicate.op
+            empty = f"({column} IS NULL OR {column} = '')"
+            if op is None or op == '!':
+                clauses.append(empty if op else f'NOT {empty}')
+            elif op in ('=', '!='):
+                values = self._values(spec, predicate)
+                test = f"{column} IN ({', '.join('?' * len(values))})"
+                clauses.append(test if op == '=' else f'({column} IS NULL OR NOT {test})')
+                params.extend(values)
+            elif op == '~':
+                clauses.append(f"instr(lower({column}), ?) > 0")
+                params.append(predicate.value.lower())
+            elif self._numeric_text(spec, predicate):
+                # Text read as a number like try_parse_float: without thousands separators or quotes
+                number = f"REPLACE(REPLACE({column}, ',', ''), '\"', '')"
+                clauses.append(f"({number} <> '' AND {number} NOT GLOB '*[^0-9.eE+-]*'"
+                               f" AND CAST({number} AS REAL) {op} ?)")
+                params.append(try_parse_float(predicate.value))
+            else:
+                clauses.append(f'{column} {op} ?')
+                params.append(self._values(spec, predicate)[0])
+        return ' AND '.join(clauses) or '1', params
+
+
+def _record_builder(record_class, columns: Sequence[str]) -> Callable[[tuple], object]:
+    """Builds a record from a row of a SqliteSink table selected in `columns` order."""
+    positions = {column: i for i, column in enumerate(columns)}
+    items = []
+    for spec in record_fields(record_class):
+        if spec.repeat:
+            items.append(f"'{spec.name}': [{', '.join(f'row[{positions[c]}]' for c in spec.columns)}]")
+        else:
+            default = "''" if spec.kind is str else 'None'
+            items.append(f"'{spec.name}': row[{positions[spec.columns[0]]}]"
+                         + (f" or {default}" if spec.kind is str else ''))
+    return compile_function(record_builder_source('build', 'row', items), 'build',
+                            codegen_namespace(record_class))
+
+
+def query_sqlite(database: str, query: Query) -> Iterator[tuple[RowType, object]]:
+    """Streams the records matching `query` from a database written by SqliteSink, in table order.
+
+    The predicates become the WHERE clause, so equality on NAME or REFNUM is
+    answered from the indexes the sink builds instead of a full table scan.
+    """
+    conn = sqlite3.connect(database)
+    try:
+        tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for row_type in RowType:
+            table = TABLE_SPECS.get(row_type)
+            if table is None or table.name not in tables or row_type not in query.sections():
+                continue
+            where, params = query.sql(row_type)
+            names = ', '.join(map(quote_identifier, table.column_names))
+            build = _record_builder(get_class_by_row_type(row_type), table.column_names)
+            for row in conn.execute(f'SELECT {names} FROM {quote_identifier(table.name)} WHERE {where} ORDER BY rowid',
+                                    params):
+                yield row_type, build(row)
+    finally:
+        conn.close()
@@ -0,0 +1,441 @@
+import dataclasses
+import typing
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+
+def try_parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value.replace(',', '').replace('"', '')) if value else None
+    except ValueError:
+        return None
+
+def try_parse_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value.replace(',', '').replace('"', '')) if value else None
+    except ValueError:
+        return None
+
+
+def iif_field(default: Any = None, *, column: Optional[str] = None, blank: str = '',
+              format: Optional[str] = None, repeat: Optional[int] = None, intern: bool = False):
+    """Declares a record field with IIF-specific options.
+
+    column: the IIF column name when it isn't a valid attribute name (e.g. 1099)
+    blank:  what to write for an empty value, QuickBooks expects 0 for some numbers
+    format: name of a method rendering the value for to_iif_row
+    repeat: store `repeat` numbered columns (AMOUNT1..AMOUNT12) as one list field
+    intern: share equal decoded values, for text fields with few distinct values
+            (types, terms, tax codes) repeated on most rows
+    """
+    metadata = {'column': column, 'blank': blank, 'format': format, 'repeat': repeat, 'intern': intern}
+    if repeat:
+        return dataclasses.field(default_factory=list, metadata=metadata)
+    return dataclasses.field(default=default, metadata=metadata)
+
+
+def base_type(annotation):
+    # Optional[X] -> X
+    if typing.get_origin(annotation) is typing.Union:
+        return next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+    return annotation
+
+
+_PARSERS = {int: '_int', float: '_float'}
+
+
+class FieldSpec:
+    """One record field and the IIF column(s) it is read from and written to."""
+
+    def __init__(self, f: dataclasses.Field):
+        self.name = f.name
+        meta = f.metadata
+        self.blank = meta.get('blank', '')
+        self.format = meta.get('format')
+        self.repeat = meta.get('repeat')
+        self.intern = meta.get('intern', False)
+        column = meta.get('column') or f.name
+        kind = base_type(f.type)
+        if self.repeat:
+            kind = base_type(typing.get_args(kind)[0])
+            self.columns = tuple(f'{column}{i}' for i in range(1, self.repeat + 1))
+        else:
+            self.columns = (column,)
+        self.kind = kind
+        self.parser = _PARSERS.get(kind)
+        self.default_expr = "''" if kind is str else 'None'
+
+    def parse_expr(self, raw: str, intern: bool = False) -> str:
+        if self.parser:
+            return f'{self.parser}({raw})'
+        if intern and self.intern:
+            # The table of the parse the decoder was compiled for, see decoder_for
+            return f'_t.setdefault({raw}, {raw})'
+        return raw
+
+
+def record_fields(cls) -> list[FieldSpec]:
+    return [FieldSpec(f) for f in dataclasses.fields(cls)]
+
+
+def compile_function(source: str, name: str, namespace: dict) -> Callable:
+    """Executes generated `source` with `namespace` as its globals and returns the function it defines as `name`.
+
+    The namespace is used as is, not copied, so the function keeps resolving
+    its globals in it; pass a fresh one from codegen_namespace() per compile
+    unless functions are meant to share it.
+    """
+    exec(source, namespace)
+    return namespace[name]
+
+
+def codegen_namespace(cls, **helpers) -> dict:
+    """A fresh globals dict for code generated for a record class.
+
+    It holds `cls`, `_new` (object.__new__, for building records without
+    __init__), the `_int` and `_float` parsers FieldSpec.parse_expr emits,
+    `_join` for repeated fields.  `helpers` adds the other names a
+    generator's source calls, e.g. per-function constants or the `_t` intern
+    table of an interning decoder; they may override the defaults.
+    """
+    return {'cls': cls, '_new': object.__new__, '_int': try_parse_int, '_float': try_parse_float,
+            '_join': _join_repeated, **helpers}
+
+
+def record_builder_source(name: str, arg: str, items: Iterable[str]) -> str:
+    """A function `name(arg)` returning a new `cls` whose __dict__ is built from the `'key': expr` items.
+
+    Filling __dict__ directly skips __init__ and any __setattr__ override.
+    """
+    return f"def {name}({arg}):\n    o = _new(cls)\n    o.__dict__ = {{{', '.join(items)}}}\n    return o\n"
+
+
+def _join_repeated(values: Optional[list], size: int) -> str:
+    values = list(values or ())[:size]
+    return '\t'.join([str(x or '') for x in values] + [''] * (size - len(values)))
+
+
+def from_row_source(cls) -> str:
+    args = []
+    for spec in record_fields(cls):
+        if spec.repeat:
+            items = ', '.join(spec.parse_expr(f"row.get('{column}')") for column in spec.columns)
+            args.append(f'{spec.name}=[{items}]')
+        elif spec.parser:
+            args.append(f"{spec.name}={spec.parse_expr(f'row.get({spec.columns[0]!r})')}")
+        else:
+            args.append(f"{spec.name}=row.get({spec.columns[0]!r}, '')")
+    body = ',\n        '.join(args)
+    return f"def from_row(cls, row):\n    return cls(\n        {body}\n    )\n"
+
+
+def _field_exprs(cls, headers: Sequence[str], fields: Optional[frozenset] = None,
+                 intern: bool = False) -> list[tuple[str, str]]:
+    """(field name, expression over the split values `v`) for one section layout.
+
+    Fields not in `fields` (by attribute or column name) get their default
+    instead of being decoded.  With `intern`, fields declared intern=True are
+    looked up in the `_t` table the decoder is compiled with, so equal values
+    share one string.
+    """
+    positions = {}
+    for i, column in enumerate(headers):
+        positions.setdefault(column, i)
+
+    def value(spec: FieldSpec, column: str) -> str:
+        i = positions.get(column)
+        if i is None or i == 0:
+            return spec.default_expr
+        return spec.parse_expr(f'v[{i}]', intern)
+
+    exprs = []
+    for spec in record_fields(cls):
+        if fields is not None and spec.name not in fields and fields.isdisjoint(spec.columns):
+            exprs.append((spec.name, '[]' if spec.repeat else spec.default_expr))
+        elif spec.repeat:
+            exprs.append((spec.name, f"[{', '.join(value(spec, column) for column in spec.columns)}]"))
+        else:
+            exprs.append((spec.name, value(spec, spec.columns[0])))
+    return exprs
+
+
+def decoder_source(cls, headers: Sequence[str], fields: Optional[frozenset] = None, intern: bool = False) -> str:
+    """A decoder for one section layout, taking the split values of a data line.
+
+    The values list must be at least as long as the headers.  Columns missing
+    from the layout are replaced by constants, so each field costs one index.
+    """
+    items = [f"'{name}': {expr}" for name, expr in _field_exprs(cls, headers, fields, intern)]
+    return record_builder_source('decode', 'v', items)
+
+
+def to_iif_header_source(cls, row_type) -> str:
+    columns = [column for spec in record_fields(cls) for column in spec.columns]
+    header = '\t'.join(['!' + row_type.value, *columns])
+    return f"def to_iif_header(cls):\n    return {header!r}\n"
+
+
+def _render_expr(spec: FieldSpec) -> str:
+    if spec.format:
+        return f'self.{spec.format}()'
+    if spec.repeat:
+        return f'_join(self.{spec.name}, {spec.repeat})'
+    return f'self.{spec.name} or {spec.blank!r}'
+
+
+def to_iif_row_source(cls, row_type) -> str:
+    parts = [row_type.value]
+    parts.extend(f'{{{_render_expr(spec)}}}' for spec in record_fields(cls))
+    body = '\\t'.join(parts)
+    return f'def to_iif_row(self):\n    return f"{body}"\n'
+
+
+def layout_encoder_source(cls, headers: Sequence[str]) -> str:
+    """An encoder writing a record in a source file's column layout.
+
+    Columns without a record field are copied from the record's raw values.
+    """
+    columns = {}
+    for spec in record_fields(cls):
+        if spec.repeat:
+            for i, column in enumerate(spec.columns):
+                columns[column] = f"str(_item(self.{spec.name}, {i}) or '')"
+        else:
+            columns[spec.columns[0]] = _render_expr(spec)
+    parts = [headers[0]]
+    parts.extend(f'{{{columns[column]}}}' if column in columns else f'{{v[{i}]}}'
+                 for i, column in enumerate(headers) if i > 0)
+    body = '\\t'.join(parts)
+    return f'def encode(self, v):\n    return f"{body}"\n'
+
+
+class SectionLayout:
+    """The header of a section as it appeared in a source file."""
+    __slots__ = ('record_class', 'headers', 'header_line', '_encode')
+
+    def __init__(self, record_class, headers: Sequence[str]):
+        self.record_class = record_class
+        self.headers = tuple(headers)
+        self.header_line = '!' + '\t'.join(self.headers)
+        self._encode = None
+
+    def encode(self, record, line: str) -> str:
+        """Re-serializes an edited record in this layout, keeping its extra columns from `line`."""
+        if self._encode is None:
+            namespace = codegen_namespace(self.record_class)
+            namespace['_item'] = lambda values, i: values[i] if values and i < len(values) else None
+            self._encode = compile_function(layout_encoder_source(self.record_class, self.headers), 'encode', namespace)
+        values = line.split('\t')
+        if len(values) < len(self.headers):
+            values.extend([''] * (len(self.headers) - len(values)))
+        return self._encode(record, values)
+
+
+def _fidelity_setattr(self, name, value):
+    object.__setattr__(self, name, value)
+    if name != '__dict__':  # the generated decoders assign __dict__ wholesale
+        self.__dict__['_iif_dirty'] = True
+
+
+def _record_eq(self, other):
+    base = self._iif_base
+    if not isinstance(other, base):
+        return NotImplemented
+    return all(getattr(self, name) == getattr(other, name) for name in base.__dataclass_fields__)
+
+
+def _restore_record(cls, state: dict):
+    record = object.__new__(cls)
+    record.__dict__.update(state)
+    return record
+
+
+def _record_reduce(self):
+    # Pickle as the plain record class, with every field decoded
+    base = self._iif_base
+    return _restore_record, (base, {name: getattr(self, name) for name in base.__dataclass_fields__})
+
+
+def _record_subclass(cls, namespace: dict):
+    """A dynamic subclass that compares, prints and pickles like the record class it extends."""
+    base = getattr(cls, '_iif_base', cls)
+    return type(cls.__name__, (cls,), {
+        '__slots__': (),
+        '__qualname__': cls.__qualname__,
+        '__module__': cls.__module__,
+        '__eq__': _record_eq,
+        '__hash__': None,
+        '__reduce__': _record_reduce,
+        '_iif_base': base,
+        **namespace,
+    })
+
+
+_fidelity_classes: dict = {}
+
+
+def fidelity_class(cls):
+    """A subclass of a record class whose instances remember their source line.
+
+    Decoded records carry `_iif_source = (layout, line)`.  Assigning any
+    attribute marks the record dirty so the writer re-serializes it; in-place
+    changes to a list field (Budget.AMOUNTS) must be followed by an assignment.
+    """
+    subclass = _fidelity_classes.get(cls)
+    if subclass is None:
+        subclass = _fidelity_classes[cls] = _record_subclass(cls, {'__setattr__': _fidelity_setattr})
+    return subclass
+
+
+class _LazyField:
+    """Decodes one field from the record's raw values on first access.
+
+    This is a non-data descriptor, so the value it stores in the instance
+    __dict__ shadows it from then on and later reads cost a plain lookup.
+    """
+    __slots__ = ('name', 'decode')
+
+    def __init__(self, name: str, decode: Callable[[list], Any]):
+        self.name = name
+        self.decode = decode
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj.__dict__[self.name] = self.decode(obj.__dict__['_iif_raw'])
+        return value
+
+
+def lazy_class(cls, headers: Sequence[str], fields: Optional[frozenset] = None):
+    """A subclass of a record class for one section layout whose fields decode on first access."""
+    exprs = _field_exprs(cls, headers, fields)
+    namespace = codegen_namespace(cls)
+    items = ', '.join(f'{name!r}: lambda v: {expr}' for name, expr in exprs)
+    getters = compile_function(f"def getters():\n    return {{{items}}}\n", 'getters', namespace)()
+    return _record_subclass(cls, {name: _LazyField(name, getter) for name, getter in getters.items()})
+
+
+def lazy_decoder_source(cls) -> str:
+    return record_builder_source('decode', 'v', ["'_iif_raw': v"])
+
+
+class IifWriter:
+    """Writes records to an open IIF file, emitting a header line whenever the section layout changes.
+
+    With fidelity, records decoded with their source line are written verbatim
+    under their original header, and edited ones are re-encoded in that layout.
+    Everything else is written with the canonical to_iif_header/to_iif_row.
+    """
+
+    def __init__(self, f, fidelity: bool = True):
+        self.f = f
+        self.fidelity = fidelity
+        self.header: Optional[str] = None
+        self._canonical_headers: dict = {}
+
+    def encode(self, record) -> tuple[str, str]:
+        """Returns the header line a record belongs under and its data line."""
+        source = getattr(record, '_iif_source', None) if self.fidelity else None
+        if source is None:
+            record_type = type(record)
+            header = self._canonical_headers.get(record_type)
+            if header is None:
+                header = record.to_iif_header()
+                if hasattr(record_type, 'ROW_TYPE'):
+                    # Generated records share one header per class
+                    self._canonical_headers[record_type] = header
+            return header, record.to_iif_row()
+        layout, line = source
+        if '_iif_dirty' in record.__dict__:
+            line = layout.encode(record, line)
+        return layout.header_line, line
+
+    def write_header(self, header: str):
+        """Starts a section with its header line even if no records follow, unless it is the current one."""
+        if header != self.header:
+            self.f.write(header + '\n')
+            self.header = header
+
+    def write_records(self, records):
+        lines = []
+        header = self.header
+        encode = self.encode
+        for record in records:
+            record_header, line = encode(record)
+            if record_header != header:
+                lines.append(record_header)
+                header = record_header
+            lines.append(line)
+        if lines:
+            lines.append('')
+            self.f.write('\n'.join(lines))
+        self.header = header
+
+
+def iif_record(row_type, registry: Optional[dict] = None):
+    """Class decorator generating the IIF codecs of a record dataclass from its fields.
+
+    Adds from_row, decoder_for, to_iif_header and to_iif_row, and registers the
+    class for `row_type` in `registry`.
+    """
+    def decorate(cls):
+        namespace = codegen_namespace(cls)
+        cls.ROW_TYPE = row_type
+        cls.IIF_COLUMNS = tuple(column for spec in record_fields(cls) for column in spec.columns)
+        cls.from_row = classmethod(compile_function(from_row_source(cls), 'from_row', namespace))
+        cls.to_iif_header = classmethod(compile_function(to_iif_header_source(cls, row_type), 'to_iif_header',
+                                                         namespace))
+        cls.to_iif_row = compile_function(to_iif_row_source(cls, row_type), 'to_iif_row', namespace)
+
+        decoders: dict[tuple, Callable] = {}
+
+        def decoder_for(cls, headers: Sequence[str], lazy: bool = False,
+                        fields: Optional[Iterable[str]] = None,
+                        intern: Optional[dict] = None) -> Callable[[list], Any]:
+            """The compiled decoder for a section layout.
+
+            A lazy decoder keeps the split values and leaves each field to be
+            decoded the first time it is read.  With `fields`, only those fields
+            are decoded and the others keep their defaults.  With an `intern`
+            table, a non-lazy decoder shares the values of intern=True fields
+            through it.  Such a decoder is compiled for that table and not
+            cached, so the table lives only as long as the caller keeps it,
+            e.g. for one parse.
+            """
+            fields = frozenset(fields) if fields is not None else None
+            if intern is not None and not lazy:
+                source = decoder_source(cls, tuple(headers), fields, intern=True)
+                return compile_function(source, 'decode', codegen_namespace(cls, _t=intern))
+            key = (cls, tuple(headers), lazy, fields)
+            decode = decoders.get(key)
+            if decode is None:
+                if lazy:
+                    source, namespace = lazy_decoder_source(cls), codegen_namespace(lazy_class(cls, key[1], fields))
+                else:
+                    source, namespace = decoder_source(cls, key[1], fields), codegen_namespace(cls)
+                decode = decoders[key] = compile_function(source, 'decode', namespace)
+            return decode
+
+        cls.decoder_for = classmethod(decoder_for)
+        if registry is not None:
+            registry[row_type] = cls
+        return cls
+    return decorate
+
+
+def generated_source(cls) -> str:
+    """The generated codec source for a record class, for inspection or ahead-of-time use."""
+    return '\n'.join([
+        from_row_source(cls),
+        decoder_source(cls, ('', *cls.IIF_COLUMNS)),
+        to_iif_header_source(cls, cls.ROW_TYPE),
+        to_iif_row_source(cls, cls.ROW_TYPE),
+    ])
+
+
+if __name__ == "__main__":
+    from iif_data_types import RowType, get_class_by_row_type
+
+    for row_type in RowType:
+        record_class = get_class_by_row_type(row_type)
+        print(f"# {record_class.__name__} ({row_type.value})")
+        print(generated_source(record_class))
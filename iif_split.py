@@ -0,0 +1,104 @@
+import codecs
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from convert import iter_iif_records
+from iif_io import open_text
+from iif_spool import SectionSpool
+
+DEFAULT_WORKERS = 4
+
+
+def _write_chunk(path: str, lines: list[str]) -> str:
+    with open_text(path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write(''.join(lines))
+    return path
+
+
+def split_iif_file(input_file: str, output_prefix: str, max_rows: Optional[int] = None,
+                   max_bytes: Optional[int] = None, suffix: str = '.iif', workers: int = DEFAULT_WORKERS,
+                   tmpdir: Optional[str] = None) -> list[str]:
+    """Splits an IIF file into import-sized chunks named <output_prefix>0001<suffix> and up.
+
+    Sections are spooled and laid out in IMPORT_ORDER, so chunks holding
+    accounts, classes and types come before the customers and items that refer
+    to them.  A chunk is closed once it holds `max_rows` data lines or the next
+    line would take it past `max_bytes`; a section cut across chunks gets its
+    header line repeated in each.  Finished chunks are written (and
+    compressed, by suffix) on `workers` threads while the next ones are laid
+    out.
+
+    Chunks aren't written with export_to_iif: capping them by size and
+    regrouping sections in IMPORT_ORDER needs every line's bytes before it is
+    placed, and the whole file can't be held in memory.  The spool encodes each
+    record with IifWriter.encode instead, so headers and fidelity handling are
+    still the writer's, and since nothing is decoded the chunks hold the input
+    lines byte for byte.
+    """
+    if not max_rows and not max_bytes:
+        raise ValueError("Give max_rows, max_bytes or both")
+
+    paths: list[str] = []
+    pending: list[Future] = []
+    with SectionSpool(tmpdir) as spool, ThreadPoolExecutor(workers) as executor:
+        # Nothing needs decoding, the fidelity records carry their source lines
+        spool.add_records(iter_iif_records(input_file, fidelity=True, fields=()))
+
+        lines: list[str] = []
+        rows = 0
+        size = len(codecs.BOM_UTF8)
+
+        def flush():
+            nonlocal lines, rows, size
+            path = f'{output_prefix}{len(paths) + 1:04d}{suffix}'
+            paths.append(path)
+            if len(pending) >= 2 * workers:
+                pending.pop(0).result()
+            pending.append(executor.submit(_write_chunk, path, lines))
+            lines, rows, size = [], 0, len(codecs.BOM_UTF8)
+
+        for section in spool.ordered():
+            header = section.header + '\n'
+            header_bytes = len(header.encode('utf-8'))
+            has_header = False
+            for line in section.lines():
+                line_bytes = len(line.encode('utf-8'))
+                if rows and ((max_rows and rows >= max_rows) or
+                             (max_bytes and size + line_bytes + (0 if has_header else header_bytes) > max_bytes)):
+                    flush()
+                    has_header = False
+                if not has_header:
+                    lines.append(header)
+                    size += header_bytes
+                    has_header = True
+                lines.append(line)
+                rows += 1
+                size += line_bytes
+        if rows:
+            flush()
+
+        for future in pending:
+            future.result()
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Split an IIF file into import-sized chunks')
+    parser.add_argument('input_file', help='Input IIF file path')
+    parser.add_argument('output_prefix', help='Chunk path prefix, e.g. out/part- for out/part-0001.iif')
+    parser.add_argument('--max-rows', type=int, help='Maximum data lines per chunk')
+    parser.add_argument('--max-bytes', type=int, help='Maximum size of a chunk in bytes')
+    parser.add_argument('--suffix', default='.iif', help='Chunk file suffix, e.g. .iif.gz to compress')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Threads writing chunks')
+    parser.add_argument('--tmpdir', help='Directory for the temporary section files')
+
+    args = parser.parse_args()
+    if not args.max_rows and not args.max_bytes:
+        parser.error('Give --max-rows, --max-bytes or both')
+    paths = split_iif_file(args.input_file, args.output_prefix, args.max_rows, args.max_bytes,
+                           args.suffix, args.workers, args.tmpdir)
+    for path in paths:
+        print(path)
+    print(f"{len(paths)} chunks")
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator, Optional, TextIO
+
+from iif_data_types import *
+from iif_schema import IifWriter
+
+SPOOL_BUFFER_SIZE = 256 << 10
+
+
+class Spool:
+    """The data lines of one section layout, in a temporary file."""
+
+    def __init__(self, section: RowType | str, header: str, path: str):
+        self.section = section
+        self.header = header
+        self.path = path
+        self.rows = 0
+        self.file: Optional[TextIO] = open(path, 'w', encoding='utf-8', newline='', buffering=SPOOL_BUFFER_SIZE)
+
+    def write(self, line: str):
+        self.file.write(line + '\n')
+        self.rows += 1
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def open(self) -> TextIO:
+        self.close()
+        return open(self.path, 'r', encoding='utf-8', newline='', buffering=SPOOL_BUFFER_SIZE)
+
+    def lines(self) -> Iterator[str]:
+        """Yields the spooled data lines, each with its newline."""
+        with self.open() as f:
+            yield from f
+
+
+class SectionSpool:
+    """Collects a record stream into one temporary file per section layout.
+
+    Records can arrive in any order, e.g. one input file after another, and
+    are read back grouped by section in the order asked for.  Lines are
+    encoded as IifWriter would, so fidelity records stay verbatim under their
+    original header.
+    """
+
+    def __init__(self, tmpdir: Optional[str] = None, fidelity: bool = True):
+        self._workdir = tempfile.TemporaryDirectory(prefix='iif-spool-', dir=tmpdir)
+        self._encode = IifWriter(None, fidelity).encode
+        self.spools: dict[str, Spool] = {}  # header line -> spool
+
+    def __enter__(self) -> 'SectionSpool':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cleanup()
+
+    def cleanup(self):
+        for spool in self.spools.values():
+            spool.close()
+        self._workdir.cleanup()
+
+    def add(self, section: RowType | str, record):
+        header, line = self._encode(record)
+        spool = self.spools.get(header)
+        if spool is None:
+            path = os.path.join(self._workdir.name, f'section{len(self.spools):04d}')
+            spool = self.spools[header] = Spool(section, header, path)
+        spool.write(line)
+
+    def add_records(self, records: Iterable[tuple[RowType | str, object]]):
+        for section, record in records:
+            self.add(section, record)
+
+    def ordered(self, order: Iterable[RowType] = IMPORT_ORDER) -> list[Spool]:
+        """The spools by section in `order`, sections not in it last, each in the order first seen."""
+        rank = {section: i for i, section in enumerate(order)}
+        return sorted(self.spools.values(), key=lambda spool: rank.get(spool.section, len(rank)))
+
+    def write_to(self, f: TextIO, order: Iterable[RowType] = IMPORT_ORDER):
+        """Writes every spooled section to an open IIF file, each under its header line."""
+        for spool in self.ordered(order):
+            f.write(spool.header + '\n')
+            with spool.open() as lines:
+                shutil.copyfileobj(lines, f)
@@ -0,0 +1,102 @@
+import pickle
+from operator import attrgetter
+from typing import Callable
+
+from iif_data_types import *
+from iif_schema import codegen_namespace, compile_function, record_builder_source, record_fields
+
+# Parsed data is shipped between processes as one pickle of plain tuples:
+#   (WIRE_VERSION, [(section, schema, rows), ...])
+# where section is a RowType value or the name of a kept unknown section, the
+# schema lists the field names of the section's record class once, and each
+# row is a tuple of field values in schema order.  Rows of unknown sections
+# are (headers, values) pairs; pickle stores each section's shared headers
+# tuple only once.
+WIRE_VERSION = 1
+GENERIC_SCHEMA = ('headers', 'values')
+
+_packers: dict[type, tuple[tuple[str, ...], Callable]] = {}
+_unpackers: dict[tuple[type, tuple[str, ...]], Callable] = {}
+
+
+def record_packer(record_class) -> tuple[tuple[str, ...], Callable]:
+    """Returns the schema of a record class and a function packing a record into a tuple."""
+    packer = _packers.get(record_class)
+    if packer is None:
+        base = getattr(record_class, '_iif_base', record_class)
+        schema = tuple(spec.name for spec in record_fields(base))
+        if not schema:
+            pack = lambda record: ()
+        elif len(schema) == 1:
+            get = attrgetter(schema[0])
+            pack = lambda record: (get(record),)
+        else:
+            pack = attrgetter(*schema)
+        packer = _packers[record_class] = (schema, pack)
+    return packer
+
+
+def unpacker_source(record_class, schema: tuple[str, ...]) -> str:
+    return record_builder_source('unpack', 'row', (f'{name!r}: row[{i}]' for i, name in enumerate(schema)))
+
+
+def record_unpacker(record_class, schema: tuple[str, ...]) -> Callable:
+    """Returns a function rebuilding a record of `record_class` from a tuple packed under `schema`."""
+    key = (record_class, schema)
+    unpack = _unpackers.get(key)
+    if unpack is None:
+        source = unpacker_source(record_class, schema)
+        unpack = _unpackers[key] = compile_function(source, 'unpack', codegen_namespace(record_class))
+    return unpack
+
+
+def pack(data: dict[RowType | str, list]) -> tuple:
+    """Turns parsed data into plain tuples, one schema per section."""
+    sections = []
+    for section, records in data.items():
+        if not records:
+            continue
+        if type(section) is str:
+            sections.append((section, GENERIC_SCHEMA, [(r.headers, r.values) for r in records]))
+            continue
+        schema, pack_record = record_packer(type(records[0]))
+        if all(type(record) is type(records[0]) for record in records):
+            rows = list(map(pack_record, records))
+        else:
+            # Mixed plain, lazy and fidelity records all share the base class schema
+            rows = [record_packer(type(record))[1](record) for record in records]
+        sections.append((section.value, schema, rows))
+    return WIRE_VERSION, sections
+
+
+def unpack(packed: tuple) -> dict[RowType | str, list]:
+    version, sections = packed
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire format version {version}")
+    data: dict[RowType | str, list] = {row_type: [] for row_type in RowType}
+    for section, schema, rows in sections:
+        if schema == GENERIC_SCHEMA:
+            data[section] = [GenericRecord(headers, values) for headers, values in rows]
+            continue
+        row_type = RowType(section)
+        data[row_type] = list(map(record_unpacker(get_class_by_row_type(row_type), schema), rows))
+    return data
+
+
+def dumps(data: dict[RowType | str, list]) -> bytes:
+    """Encodes parsed data far more compactly than pickling the records themselves.
+
+    Lazy records are decoded in full; fidelity records lose their source line
+    and come back as plain records.
+    """
+    return pickle.dumps(pack(data), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(payload: bytes) -> dict[RowType | str, list]:
+    return unpack(pickle.loads(payload))
+
+
+def parse_iif_file_packed(file_path: str, **kwargs) -> bytes:
+    """parse_iif_file for worker processes: returns the result already encoded for loads()."""
+    from convert import parse_iif_file  # convert sorts through this module
+    return dumps(parse_iif_file(file_path, **kwargs))
@@ -0,0 +1,107 @@
+import json
+import sys
+from typing import Callable, Iterable, Optional
+
+from iif_data_types import *
+from iif_schema import codegen_namespace, compile_function, record_fields
+from iif_io import WRITE_BUFFER_SIZE
+from export_pipeline import Sink, open_output, output_position, output_resumable
+
+STDOUT = '-'
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+_encoders: dict[type, Callable[[object], str]] = {}
+
+
+def jsonl_encoder_source(cls, section: str) -> str:
+    """Source of a function rendering one record of `cls` as a JSON line.
+
+    Keys are the IIF column names; a repeated field such as Budget.AMOUNTS is
+    written as a list.  Strings and ints take a fast path and anything else,
+    including None, goes through the json encoder.
+    """
+    items = [repr('{"SECTION":' + _dumps(section))]
+    for spec in record_fields(cls):
+        key = spec.name if spec.repeat else spec.columns[0]
+        items.append(repr(',' + _dumps(key) + ':'))
+        value = f'r.{spec.name}'
+        if spec.repeat:
+            items.append(f'_dumps({value})')
+        elif spec.kind is str:
+            items.append(f'(_str(v) if type(v := {value}) is str else _dumps(v))')
+        elif spec.kind is int:
+            items.append(f'(str(v) if type(v := {value}) is int else _dumps(v))')
+        else:
+            items.append(f'_dumps({value})')
+    items.append(repr('}\n'))
+    return f"def encode(r):\n    return ''.join(({', '.join(items)}))\n"
+
+
+def generic_record_to_json(record: GenericRecord) -> str:
+    """Renders a record of a section kept by a robust parse, keyed by its own header columns."""
+    return _dumps({'SECTION': record.SECTION, **dict(zip(record.headers[1:], record.values[1:]))}) + '\n'
+
+
+def jsonl_encoder(record_class) -> Callable[[object], str]:
+    encode = _encoders.get(record_class)
+    if encode is None and record_class is GenericRecord:
+        encode = _encoders[record_class] = generic_record_to_json
+    elif encode is None:
+        base = getattr(record_class, '_iif_base', record_class)
+        namespace = codegen_namespace(base, _str=json.encoder.encode_basestring, _dumps=_dumps)
+        source = jsonl_encoder_source(base, base.ROW_TYPE.value)
+        encode = _encoders[record_class] = compile_function(source, 'encode', namespace)
+    return encode
+
+
+def record_to_json(record) -> str:
+    return jsonl_encoder(type(record))(record)
+
+
+class JsonlSink(Sink):
+    """Writes every record as one JSON object per line, tagged with its SECTION.
+
+    An output file of '-' writes to stdout, so the stream can be piped straight
+    into another tool.  Without `row_types`, the sections kept by a robust
+    parse are written too, keyed by their own header columns.
+    """
+
+    def __init__(self, output_file: str, row_types: Optional[Iterable[RowType]] = None):
+        self.output_file = output_file
+        self.row_types = frozenset(row_types if row_types is not None else RowType)
+        self.unknown_sections = row_types is None
+        self.resumable = output_file != STDOUT and output_resumable(output_file)
+        self.file = None
+
+    def open(self):
+        if self.output_file == STDOUT:
+            self.file = open(sys.stdout.fileno(), 'w', encoding='utf-8', newline='',
+                             buffering=WRITE_BUFFER_SIZE, closefd=False)
+        else:
+            self.file = open_output(self.output_file, 'utf-8', self.resume_state)
+
+    def write_batch(self, records: list):
+        encoders = _encoders
+        parts = []
+        for record in records:
+            encode = encoders.get(type(record)) or jsonl_encoder(type(record))
+            parts.append(encode(record))
+        self.file.write(''.join(parts))
+
+    def state(self) -> dict:
+        return {'position': output_position(self.file)}
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def export_to_jsonl(data: dict[RowType, list], output_file: str):
+    sink = JsonlSink(output_file)
+    sink.open()
+    try:
+        for row_type in RowType:
+            if records := data.get(row_type):
+                sink.write_batch(records)
+    finally:
+        sink.close()
@@ -0,0 +1,162 @@
+import csv
+from typing import Iterable, Iterator, Optional
+
+from iif_data_types import *
+from iif_schema import IifWriter, record_fields, try_parse_float
+from iif_io import open_text
+from field_mapping import MappingSpec
+from convert import CSV_COLUMNS, CSV_ROW_TYPES
+
+# QIF account types to the closest IIF ACCNTTYPE; account_to_qif maps many IIF
+# types onto each QIF one, so this can't restore the exact original type
+QIF_ACCOUNT_TYPE_MAPPING = {
+    'Bank': 'BANK',
+    'Cash': 'BANK',
+    'CCard': 'CCARD',
+    'Invst': 'OCASSET',
+    'Port': 'OCASSET',
+    'Oth A': 'OCASSET',
+    'Oth L': 'OCLIAB',
+}
+
+OPENING_BALANCE_MEMO = 'Opening Balance'
+
+# Every column each row type's CSV export can write; a CSV only needs some of them
+DEFAULT_CSV_SPECS = {row_type: CSV_COLUMNS[export_name] for export_name, row_type in CSV_ROW_TYPES.items()}
+
+
+def map_qif_account_type(account_type: str) -> str:
+    return QIF_ACCOUNT_TYPE_MAPPING.get(account_type, 'BANK')
+
+
+def iter_qif_accounts(input_qif: str) -> Iterator[Account]:
+    """Streams the accounts of a QIF file, as written by export_to_qif or GnuCash.
+
+    An account's opening balance is read from the 'Opening Balance'
+    transaction that follows its !Account block; other transactions are
+    skipped.  Only the current account is held in memory.
+    """
+    account: Optional[Account] = None
+    in_account_list = False
+    item: dict[str, str] = {}
+    with open_text(input_qif, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line:
+                continue
+            code, value = line[0], line[1:]
+            if code == '!':
+                in_account_list = value == 'Account'
+                if in_account_list and account is not None:
+                    yield account
+                    account = None
+                item = {}
+            elif code == '^':
+                if in_account_list:
+                    if account is not None:
+                        yield account
+                    account = Account(NAME=item.get('N', ''), ACCNTTYPE=map_qif_account_type(item.get('T', '')),
+                                      DESC=item.get('D', ''))
+                elif account is not None and item.get('M') == OPENING_BALANCE_MEMO:
+                    account.OBAMOUNT = try_parse_float(item.get('T'))
+                item = {}
+            else:
+                item.setdefault(code, value)
+    if account is not None:
+        yield account
+
+
+def csv_headers(record_class, spec: MappingSpec, csv_columns: Iterable[str]) -> tuple[str, ...]:
+    """The IIF section header equivalent to a CSV header row under a mapping spec.
+
+    Each CSV column mapped to a record field in the spec becomes that field's
+    IIF column; unmapped and computed columns become blanks that no field
+    reads.  Decoding ['', *csv_row] with the class decoder for these headers
+    then builds the record.
+    """
+    columns = {spec.name: spec.columns[0] for spec in record_fields(record_class) if not spec.repeat}
+    sources = {column: source for column, source in spec}
+    headers = [record_class.ROW_TYPE.value]
+    for column in csv_columns:
+        source = sources.get(column)
+        headers.append(columns.get(source, '') if isinstance(source, str) else '')
+    return tuple(headers)
+
+
+def iter_csv_records(input_csv: str, row_type: RowType, spec: Optional[MappingSpec] = None) -> Iterator:
+    """Streams records of `row_type` from a CSV written with the inverse of `spec`."""
+    record_class = get_class_by_row_type(row_type)
+    if spec is None:
+        spec = DEFAULT_CSV_SPECS[row_type]
+    with open_text(input_csv, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        decode = record_class.decoder_for(csv_headers(record_class, spec, header))
+        width = len(header) + 1
+        for row in reader:
+            if not row:
+                continue
+            values = ['', *row]
+            if len(values) < width:
+                values.extend([''] * (width - len(values)))
+            yield decode(values)
+
+
+def write_iif(records: Iterable, output_file: str, batch_size: int = 2000):
+    """Writes a record stream through the IIF serializer in batches."""
+    with open_text(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = IifWriter(f, fidelity=False)
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                writer.write_records(batch)
+                batch = []
+        writer.write_records(batch)
+
+
+def qif_to_iif(input_qif: str, output_file: str):
+    write_iif(iter_qif_accounts(input_qif), output_file)
+
+
+def csv_to_iif(input_csv: str, output_file: str, row_type: RowType, spec: Optional[MappingSpec] = None):
+    write_iif(iter_csv_records(input_csv, row_type, spec), output_file)
+
+
+if __name__ == "__main__":
+    import argparse
+    from itertools import chain
+    from field_mapping import load_spec
+
+    parser = argparse.ArgumentParser(description='Convert QIF accounts and CSV name lists to an IIF file')
+    parser.add_argument('output_file', help='Output IIF file path')
+    parser.add_argument('--qif', help='Read accounts from a QIF file', metavar='FILE')
+    parser.add_argument('--vendors', help='Read vendors from a CSV file', metavar='FILE')
+    parser.add_argument('--othernames', help='Read other names from a CSV file', metavar='FILE')
+    parser.add_argument('--customers', help='Read customers from a CSV file', metavar='FILE')
+    parser.add_argument('--mapping', action='append', default=[], metavar='EXPORT=FILE',
+                        help='The JSON column mapping spec the customers, vendors or othernames CSV was written with')
+
+    args = parser.parse_args()
+    mappings = {}
+    for mapping in args.mapping:
+        export_name, _, spec_file = mapping.partition('=')
+        if export_name not in CSV_ROW_TYPES or not spec_file:
+            parser.error(f"Invalid --mapping '{mapping}'")
+        try:
+            mappings[export_name] = load_spec(spec_file, get_class_by_row_type(CSV_ROW_TYPES[export_name]))
+        except ValueError as e:
+            parser.error(str(e))
+
+    # Lists in import order, accounts first
+    streams = []
+    if args.qif:
+        streams.append(iter_qif_accounts(args.qif))
+    for export_name in ('vendors', 'othernames', 'customers'):
+        if input_csv := getattr(args, export_name):
+            streams.append(iter_csv_records(input_csv, CSV_ROW_TYPES[export_name], mappings.get(export_name)))
+    if not streams:
+        parser.error('Give at least one of --qif, --vendors, --othernames or --customers')
+    write_iif(chain.from_iterable(streams), args.output_file)
@@ -0,0 +1,246 @@
+import dataclasses
+import sqlite3
+from itertools import groupby
+from typing import Iterable, Optional
+
+from iif_data_types import *
+from iif_schema import codegen_namespace, compile_function, record_fields
+from export_pipeline import Sink
+
+TRANSACTION_ROWS = 200000
+INDEXED_COLUMNS = ('NAME', 'REFNUM')
+# What identifies a row without a REFNUM in an incremental load, the first one a table has
+FALLBACK_KEYS = ('NAME', 'CODE', 'INIT')
+
+_SQLITE_TYPES = {int: 'INTEGER', float: 'REAL', str: 'TEXT'}
+
+
+def quote_identifier(identifier: str) -> str:
+    """Quotes a table or column name for SQL, doubling any quote in it."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _item_at(values: Optional[list], i: int):
+    return values[i] if values and i < len(values) else None
+
+
+class TableSpec:
+    """The SQLite table layout for one RowType, derived from its dataclass fields."""
+
+    def __init__(self, row_type: RowType, record_class):
+        self.row_type = row_type
+        self.name = row_type.value
+        self.columns: list[tuple[str, str]] = []
+        items = []
+        for spec in record_fields(record_class):
+            sql_type = _SQLITE_TYPES.get(spec.kind, 'TEXT')
+            if spec.repeat:
+                # Budget.AMOUNTS is stored as AMOUNT1..AMOUNT12
+                for i, column in enumerate(spec.columns):
+                    self.columns.append((column, sql_type))
+                    items.append(f'_at(r.{spec.name}, {i})')
+            else:
+                self.columns.append((spec.columns[0], sql_type))
+                items.append(f'r.{spec.name}')
+
+        self.row = compile_function(f"def row(r):\n    return ({', '.join(items)},)\n", 'row',
+                                    codegen_namespace(record_class, _at=_item_at))
+
+        self.column_names = [name for name, _ in self.columns]
+        self.has_refnum = 'REFNUM' in self.column_names
+        self.has_timestamp = 'TIMESTAMP' in self.column_names
+        self.refnum_index = self.column_names.index('REFNUM') if self.has_refnum else None
+        # Rows without a REFNUM are matched on a fallback key, or on every column
+        fallback = next((name for name in FALLBACK_KEYS if name in self.column_names), None)
+        self.fallback_key = [fallback] if fallback else list(self.column_names)
+
+    def create_sql(self) -> str:
+        columns = ', '.join(f'{quote_identifier(name)} {sql_type}' for name, sql_type in self.columns)
+        return f'CREATE TABLE IF NOT EXISTS {quote_identifier(self.name)} ({columns})'
+
+    def insert_sql(self, incremental: bool) -> str:
+        names = ', '.join(map(quote_identifier, self.column_names))
+        placeholders = ', '.join('?' * len(self.column_names))
+        sql = f'INSERT INTO {quote_identifier(self.name)} ({names}) VALUES ({placeholders})'
+        if incremental and self.has_refnum:
+            updates = ', '.join(f'{quote_identifier(name)}=excluded.{quote_identifier(name)}'
+                                for name in self.column_names if name != 'REFNUM')
+            sql += f' ON CONFLICT("REFNUM") DO UPDATE SET {updates}'
+            if self.has_timestamp:
+                # Only replace a stored row with a newer version of it
+                sql += (f' WHERE excluded."TIMESTAMP" IS NULL OR {quote_identifier(self.name)}."TIMESTAMP" IS NULL'
+                        f' OR excluded."TIMESTAMP" > {quote_identifier(self.name)}."TIMESTAMP"')
+        return sql
+
+    def update_without_refnum_sql(self) -> str:
+        """Replaces the stored row without a REFNUM that has the same fallback key as the row passed."""
+        updates = ', '.join(f'{quote_identifier(name)}=?' for name in self.column_names)
+        keys = ' AND '.join(f'{quote_identifier(name)} IS ?' for name in self.fallback_key)
+        return f'UPDATE {quote_identifier(self.name)} SET {updates} WHERE "REFNUM" IS NULL AND {keys}'
+
+    def index_sql(self, column: str, unique: bool = False) -> str:
+        kind, prefix = ('UNIQUE INDEX', 'ux') if unique else ('INDEX', 'ix')
+        return (f'CREATE {kind} IF NOT EXISTS {quote_identifier(f"{prefix}_{self.name}_{column}")} '
+                f'ON {quote_identifier(self.name)} ({quote_identifier(column)})')
+
+
+TABLE_SPECS: dict[RowType, TableSpec] = {
+    row_type: TableSpec(row_type, get_class_by_row_type(row_type))
+    for row_type in RowType
+    if dataclasses.fields(get_class_by_row_type(row_type))
+}
+
+
+class SqliteSink(Sink):
+    """Bulk loads records into one table per RowType.
+
+    A fresh load drops and recreates the tables, disables journaling and builds
+    the NAME/REFNUM indexes after all rows are in.  An incremental load keeps
+    the existing rows and upserts by REFNUM, replacing a row only when the
+    incoming TIMESTAMP is newer; tables without a REFNUM are replaced whole.
+    Rows without a REFNUM can't conflict on it, so they replace the stored row
+    with the same NAME (CODE, INIT, or all columns where there is none).
+
+    If the export fails, the current transaction is rolled back and no indexes
+    are built; a fresh load, which runs without a journal, drops its tables
+    instead so a half-loaded database can't pass for a complete one.
+
+    Only incremental loads are resumable: a fresh load runs without a journal,
+    so a crash can leave it unusable.  Resuming one replays the upserts, which
+    leaves upserted rows as they were, and drops the rows added to the other
+    tables after the state() it resumes from.
+    """
+
+    def __init__(self, database: str, incremental: bool = False, row_types: Optional[Iterable[RowType]] = None):
+        self.database = database
+        self.incremental = incremental
+        self.resumable = incremental
+        self.row_types = frozenset(row_types if row_types is not None else TABLE_SPECS) & frozenset(TABLE_SPECS)
+        self._by_class = {get_class_by_row_type(row_type): TABLE_SPECS[row_type] for row_type in self.row_types}
+        self._insert_sql: dict[RowType, str] = {}
+        self._uncommitted = 0
+        self.conn: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        self.conn = sqlite3.connect(self.database, isolation_level=None)
+        if self.incremental:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+        else:
+            self.conn.execute('PRAGMA journal_mode=OFF')
+            self.conn.execute('PRAGMA synchronous=OFF')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        self.conn.execute('PRAGMA cache_size=-262144')  # 256 MiB page cache
+
+        self.conn.execute('BEGIN')
+        for row_type in self.row_types:
+            table = TABLE_SPECS[row_type]
+            if self.incremental:
+                self.conn.execute(table.create_sql())
+                if table.has_refnum:
+                    # ON CONFLICT needs the unique index in place before loading
+                    self.conn.execute(table.index_sql('REFNUM', unique=True))
+                elif self.resume_state is not None:
+                    self.conn.execute(f'DELETE FROM {quote_identifier(table.name)} WHERE rowid > ?',
+                                      (self.resume_state['rowids'].get(table.name, 0),))
+                else:
+                    self.conn.execute(f'DELETE FROM {quote_identifier(table.name)}')
+            else:
+                self.conn.execute(f'DROP TABLE IF EXISTS {quote_identifier(table.name)}')
+                self.conn.execute(table.create_sql())
+            self._insert_sql[row_type] = table.insert_sql(self.incremental)
+
+    def _table_for(self, record_class) -> TableSpec:
+        table = self._by_class.get(record_class)
+        if table is None:
+            table = next(self._by_class[base] for base in record_class.__mro__ if base in self._by_class)
+            self._by_class[record_class] = table
+        return table
+
+    def write_batch(self, records: list):
+        for record_class, group in groupby(records, type):
+            table = self._table_for(record_class)
+            rows = map(table.row, group)
+            if self.incremental and table.has_refnum:
+                rows = list(rows)
+                if any(row[table.refnum_index] is None for row in rows):
+                    self._write_without_refnum(table, [row for row in rows if row[table.refnum_index] is None])
+                    rows = [row for row in rows if row[table.refnum_index] is not None]
+            cursor = self.conn.executemany(self._insert_sql[table.row_type], rows)
+            self._uncommitted += cursor.rowcount
+        if self._uncommitted >= TRANSACTION_ROWS:
+            self.conn.execute('COMMIT')
+            self.conn.execute('BEGIN')
+            self._uncommitted = 0
+
+    def _write_without_refnum(self, table: TableSpec, rows: list[tuple]):
+        update_sql = table.update_without_refnum_sql()
+        insert_sql = table.insert_sql(incremental=False)
+        key_indexes = [table.column_names.index(name) for name in table.fallback_key]
+        for row in rows:
+            cursor = self.conn.execute(update_sql, (*row, *(row[i] for i in key_indexes)))
+            if not cursor.rowcount:
+                self.conn.execute(insert_sql, row)
+            self._uncommitted += 1
+
+    def state(self) -> dict:
+        self.conn.execute('COMMIT')
+        # Copy the WAL into the database so the commit survives a host crash too
+        self.conn.execute('PRAGMA wal_checkpoint(FULL)')
+        self.conn.execute('BEGIN')
+        self._uncommitted = 0
+        rowids = {}
+        for row_type in self.row_types:
+            table = TABLE_SPECS[row_type]
+            if not table.has_refnum:
+                last = self.conn.execute(f'SELECT max(rowid) FROM {quote_identifier(table.name)}').fetchone()[0]
+                rowids[table.name] = last or 0
+        return {'rowids': rowids}
+
+    def close(self):
+        if self.conn is None:
+            return
+        if self.failed:
+            try:
+                self._discard()
+            finally:
+                self.conn.close()
+            return
+        try:
+            if self.conn.in_transaction:
+                self.conn.execute('COMMIT')
+            self.conn.execute('BEGIN')
+            for row_type in self.row_types:
+                table = TABLE_SPECS[row_type]
+                for column in INDEXED_COLUMNS:
+                    if column in table.column_names:
+                        self.conn.execute(table.index_sql(column, unique=self.incremental and column == 'REFNUM'))
+            self.conn.execute('COMMIT')
+        finally:
+            self.conn.close()
+
+    def _discard(self):
+        if self.incremental:
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+            return
+        # Without a journal there is nothing to roll back to
+        if self.conn.in_transaction:
+            self.conn.execute('COMMIT')
+        for row_type in self.row_types:
+            self.conn.execute(f'DROP TABLE IF EXISTS {quote_identifier(TABLE_SPECS[row_type].name)}')
+
+
+def export_to_sqlite(data: dict[RowType, list], database: str, incremental: bool = False):
+    sink = SqliteSink(database, incremental)
+    sink.open()
+    try:
+        for row_type in sink.row_types:
+            records = data.get(row_type, [])
+            for start in range(0, len(records), TRANSACTION_ROWS):
+                sink.write_batch(records[start:start + TRANSACTION_ROWS])
+    except BaseException:
+        sink.failed = True
+        raise
+    finally:
+        sink.close()